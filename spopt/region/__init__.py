@@ -1,8 +1,13 @@
 from .azp import AZP
 from .base import w_to_g
 from .maxp import MaxPHeuristic
-from .random_region import RandomRegion, RandomRegions
+from .random_region import (
+    RandomRegion,
+    RandomRegions,
+    iter_random_labels,
+    random_labels,
+)
 from .region_k_means import RegionKMeansHeuristic
-from .skater import Skater
+from .skater import Skater, SkaterBatch
 from .spenc import Spenc
 from .ward import WardSpatial
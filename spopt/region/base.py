@@ -5,6 +5,7 @@ import copy
 import libpysal
 import networkx
 import numpy
+from scipy import sparse
 from scipy.spatial import KDTree
 
 
@@ -56,6 +57,175 @@ def w_to_g(w):
     return g
 
 
+class ContiguityOracle:
+    """Check whether moving areas between regions keeps every region connected.
+
+    The adjacency is held as CSR arrays, and the articulation points of each
+    region are found once and cached until a move changes that region, so
+    checking a move costs a lookup instead of a connectivity search.
+
+    Parameters
+    ----------
+
+    w : libpysal.weights.W, scipy.sparse matrix
+        Spatial weights, treated as undirected and unweighted.
+    labels : numpy.array
+        Region label of each area. The array is shared, not copied, and is
+        updated by ``move``.
+
+    """
+
+    def __init__(self, w, labels):
+        adjacency = w.sparse if isinstance(w, libpysal.weights.W) else w
+        adjacency = sparse.csr_matrix(adjacency, dtype=bool)
+        adjacency = (adjacency + adjacency.T).tocsr()
+        adjacency.setdiag(False)
+        adjacency.eliminate_zeros()
+        self.indptr = adjacency.indptr
+        self.indices = adjacency.indices
+        self.labels = labels
+        self._cuts = {}
+
+    def neighbors(self, area):
+        """Areas adjacent to ``area``."""
+        return self.indices[self.indptr[area] : self.indptr[area + 1]]
+
+    def is_neighbor(self, area, region):
+        """Check if ``area`` is adjacent to any member of region label ``region``."""
+        return bool((self.labels[self.neighbors(area)] == region).any())
+
+    def move_ok(self, area, destination):
+        """Check if ``area`` can move from its region to region ``destination``.
+
+        The area must be adjacent to the destination, and its region must be
+        connected and non-empty without it.
+        """
+        if not self.is_neighbor(area, destination):
+            return False
+        articulation = self._articulation(self.labels[area])
+        n_components, _, isolated = articulation
+        if n_components == 1 and area in isolated:
+            # the sole area of its region
+            return False
+        return _is_removable(area, articulation)
+
+    def move(self, area, destination):
+        """Move ``area`` to region ``destination``."""
+        self._cuts.pop(self.labels[area], None)
+        self._cuts.pop(destination, None)
+        self.labels[area] = destination
+
+    def _articulation(self, region):
+        """Components, articulation points and isolated areas of a region."""
+        if region not in self._cuts:
+            self._cuts[region] = _articulation_points(
+                self.indptr, self.indices, self.labels == region
+            )
+        return self._cuts[region]
+
+
+def _articulation_points(indptr, indices, mask, nodes=None):
+    """Find the articulation points of the subgraph induced by a set of nodes.
+
+    An iterative version of the depth-first search of Hopcroft and Tarjan.
+
+    Parameters
+    ----------
+
+    indptr, indices : numpy.array
+        CSR structure of a symmetric adjacency matrix.
+    mask : numpy.array, bytearray
+        Boolean membership of each node in the subgraph.
+    nodes : list (default None)
+        The nodes of the subgraph. If given, ``mask`` is indexed directly
+        instead of being scanned, so the search does not touch the other nodes.
+
+    Returns
+    -------
+
+    n_components : int
+        The number of connected components of the subgraph.
+    points : set
+        Nodes whose removal disconnects their component.
+    isolated : set
+        Nodes without neighbors in the subgraph.
+
+    """
+
+    discovery, low = {}, {}
+    points, isolated = set(), set()
+    n_components = 0
+    if nodes is None:
+        member, nodes = mask.tolist(), numpy.flatnonzero(mask).tolist()
+    else:
+        member = mask
+    for root in nodes:
+        if root in discovery:
+            continue
+        n_components += 1
+        discovery[root] = low[root] = len(discovery)
+        n_children = 0
+        stack = [(root, -1, iter(indices[indptr[root] : indptr[root + 1]].tolist()))]
+        while stack:
+            node, parent, alters = stack[-1]
+            for alter in alters:
+                if not member[alter]:
+                    continue
+                if alter not in discovery:
+                    discovery[alter] = low[alter] = len(discovery)
+                    stack.append(
+                        (
+                            alter,
+                            node,
+                            iter(indices[indptr[alter] : indptr[alter + 1]].tolist()),
+                        )
+                    )
+                    break
+                if alter != parent:
+                    low[node] = min(low[node], discovery[alter])
+            else:
+                stack.pop()
+                if parent == -1:
+                    continue
+                low[parent] = min(low[parent], low[node])
+                if parent == root:
+                    n_children += 1
+                elif low[node] >= discovery[parent]:
+                    points.add(parent)
+        if n_children > 1:
+            points.add(root)
+        elif n_children == 0:
+            isolated.add(root)
+    return n_components, points, isolated
+
+
+def _is_removable(node, articulation):
+    """Check if a subgraph stays connected without one of its nodes.
+
+    Parameters
+    ----------
+
+    node : int
+        A node of the subgraph.
+    articulation : tuple
+        The ``(n_components, points, isolated)`` of the subgraph, as returned
+        by ``_articulation_points``.
+
+    Returns
+    -------
+
+    removable : bool
+        ``True`` if the other nodes are connected, an empty subgraph included.
+
+    """
+
+    n_components, points, isolated = articulation
+    if n_components == 1:
+        return node not in points
+    # a disconnected subgraph is only mended by removing a stray isolated node
+    return n_components == 2 and node in isolated
+
+
 def move_ok(area, source, destination, g, w):
     """Check if area can move from source region to destination region.
 
@@ -178,10 +348,47 @@ def _centroid(regions, data):
 
     """
 
-    _centroid_ = numpy.array([data[region, :].mean(axis=0) for region in regions])
+    data = numpy.asarray(data, dtype=float)
+    members = numpy.concatenate([numpy.asarray(r, dtype=int) for r in regions])
+    sizes = numpy.array([len(region) for region in regions])
+    sums = numpy.zeros((len(regions), data.shape[1]))
+    numpy.add.at(sums, numpy.repeat(numpy.arange(len(regions)), sizes), data[members])
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        _centroid_ = sums / sizes[:, None]
     return _centroid_
 
 
+def _sq_distances(data, centroids):
+    """Squared euclidean distances from every row in data to every centroid.
+
+    Parameters
+    ----------
+
+    data : numpy.array
+        All data coordinates.
+    centroids : numpy.array
+        Centroid coordinates.
+
+    Returns
+    -------
+
+    _sq_distances_ : numpy.array
+        Array shaped ``(n_samples, n_centroids)`` computed as
+        :math:`|x|^2 - 2 x \\cdot c + |c|^2`, so that the cross terms
+        are a single matrix product.
+
+    """
+
+    data = numpy.asarray(data, dtype=float)
+    centroids = numpy.asarray(centroids, dtype=float)
+    _sq_distances_ = data @ centroids.T
+    _sq_distances_ *= -2
+    _sq_distances_ += (data**2).sum(axis=1)[:, None]
+    _sq_distances_ += (centroids**2).sum(axis=1)
+    numpy.maximum(_sq_distances_, 0, out=_sq_distances_)
+    return _sq_distances_
+
+
 def _closest(data, centroids):
     """For each row in data, find the closest row in centroids.
 
@@ -196,15 +403,50 @@ def _closest(data, centroids):
     Returns
     -------
 
-    _closest_ : list
+    _closest_ : numpy.array
         The closest row in ``centroids`` for each row in ``data``.
 
     """
 
-    _closest_ = [numpy.argmin(((row - centroids) ** 2).sum(axis=1)) for row in data]
+    _closest_ = _sq_distances(data, centroids).argmin(axis=1)
     return _closest_
 
 
+def _refresh_closest(data, centroids, distances, closest, changed):
+    """Update the distances and closest centroids after some centroids moved.
+
+    Only the columns of ``distances`` for the ``changed`` centroids are
+    recomputed, and only the rows whose closest centroid could have changed are
+    searched again: those closest to a changed centroid, and those now at
+    least as close to a changed centroid as to their closest one.
+
+    Parameters
+    ----------
+
+    data : numpy.array
+        All data coordinates.
+    centroids : numpy.array
+        Centroid coordinates, including the moved ones.
+    distances : numpy.array
+        Squared distances from ``_sq_distances`` for the previous centroids.
+        Updated in place.
+    closest : numpy.array
+        The closest centroid for each row for the previous centroids.
+        Updated in place.
+    changed : list
+        Indices of the centroids that moved.
+
+    """
+
+    changed = numpy.asarray(changed)
+    distances[:, changed] = _sq_distances(data, centroids[changed])
+    current = distances[numpy.arange(distances.shape[0]), closest]
+    stale = numpy.isin(closest, changed) | (
+        distances[:, changed].min(axis=1) <= current
+    )
+    closest[stale] = distances[stale].argmin(axis=1)
+
+
 def _seeds(areas, k, seed):
     """Randomly select ``k`` seeds from a sequence of areas.
 
@@ -5,10 +5,14 @@ Checking for connected components in a graph.
 __author__ = "Sergio J. Rey <srey@asu.edu>"
 
 
-__all__ = ["check_contiguity"]
+__all__ = ["check_contiguity", "Contiguity"]
 
 from operator import lt
 
+import numpy
+
+from .base import _articulation_points, _is_removable
+
 
 def is_component(w, ids):
     """Check if the set of ids form a single connected component
@@ -34,20 +38,22 @@ def is_component(w, ids):
 
     components = 0
     marks = {node: 0 for node in ids}
+    queued = set()
     q = []
     for node in ids:
         if marks[node] == 0:
             components += 1
             q.append(node)
+            queued.add(node)
             if components > 1:
                 return False
         while q:
             node = q.pop()
             marks[node] = components
-            others = [neighbor for neighbor in w.neighbors[node] if neighbor in ids]
-            for other in others:
-                if marks[other] == 0 and other not in q:
+            for other in w.neighbors[node]:
+                if other in marks and marks[other] == 0 and other not in queued:
                     q.append(other)
+                    queued.add(other)
     return True
 
 
@@ -104,6 +110,109 @@ def check_contiguity(w, neighbors, leaver):
     return is_component(w, ids)
 
 
+class Contiguity:
+    """Array-native contiguity tests over the CSR structure of an adjacency.
+
+    Membership of the tested areas and the visits of the search are marked in
+    buffers held across calls, and only the marked entries are reset, so a
+    test costs :math:`O(|ids| + edges)` whatever the number of areas.
+
+    Parameters
+    ----------
+
+    indptr, indices : numpy.array
+        CSR structure of a symmetric adjacency matrix over area positions.
+
+    Examples
+    --------
+
+    >>> import libpysal
+    >>> from spopt.region.components import Contiguity
+    >>> w = libpysal.weights.lat2W(5, 5).sparse
+    >>> contiguity = Contiguity(w.indptr, w.indices)
+    >>> contiguity.check_contiguity([0, 1, 2, 3, 4], 3)
+    False
+    >>> contiguity.removable([0, 1, 2, 3, 4]).tolist()
+    [True, False, False, False, True]
+
+    """
+
+    def __init__(self, indptr, indices):
+        self.indptr = numpy.asarray(indptr)
+        self.indices = numpy.asarray(indices)
+        # python lists and bytearrays are much faster to index one at a time
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        n = len(self._indptr) - 1
+        self._member = bytearray(n)
+        self._visited = bytearray(n)
+
+    def is_component(self, ids):
+        """Check if the areas at positions ``ids`` form a single connected
+        component. An empty set of areas is connected.
+        """
+        if len(ids) == 0:
+            return True
+        indptr, indices = self._indptr, self._indices
+        member, visited = self._member, self._visited
+        for i in ids:
+            member[i] = True
+        root = ids[0]
+        visited[root] = True
+        queue = [root]
+        # the queue only grows, so it ends as the list of visited areas
+        for node in queue:
+            for alter in indices[indptr[node] : indptr[node + 1]]:
+                if member[alter] and not visited[alter]:
+                    visited[alter] = True
+                    queue.append(alter)
+        for i in ids:
+            member[i] = False
+        for i in queue:
+            visited[i] = False
+        return len(queue) == len(set(ids))
+
+    def check_contiguity(self, ids, leaver):
+        """Check if the areas at positions ``ids`` stay connected without
+        ``leaver``.
+        """
+        return self.is_component([i for i in ids if i != leaver])
+
+    def removable(self, ids):
+        """Check, for each area in ``ids``, if the other areas stay connected
+        without it.
+
+        The batched form of ``check_contiguity``, answered with one search for
+        the articulation points of the areas rather than one search per area.
+
+        Parameters
+        ----------
+
+        ids : list
+            Positions of the areas, which need not be connected.
+
+        Returns
+        -------
+
+        removable : numpy.array
+            ``True`` where removing the area from ``ids`` leaves the rest
+            connected, aligned with ``ids``.
+
+        """
+        ids = numpy.asarray(ids, dtype=numpy.intp).tolist()
+        member = self._member
+        for i in ids:
+            member[i] = True
+        try:
+            articulation = _articulation_points(
+                self.indptr, self.indices, member, nodes=ids
+            )
+        finally:
+            for i in ids:
+                member[i] = False
+        return numpy.array([_is_removable(i, articulation) for i in ids], dtype=bool)
+
+
 class Graph:
     def __init__(self, undirected=True):
         self.nodes = set()
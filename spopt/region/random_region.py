@@ -8,12 +8,207 @@ on cardinality and composition.
 __author__ = "David Folch David.Folch@nau.edu, Serge Rey sergio.rey@ucr.edu"
 
 import copy
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 
-from .components import check_contiguity
+from .components import Contiguity
 
-__all__ = ["RandomRegions", "RandomRegion"]
+__all__ = ["RandomRegions", "RandomRegion", "iter_random_labels", "random_labels"]
+
+
+def _random_state(seed):
+    """The random number generator drawing a ``RandomRegion``."""
+    if seed is None:
+        # the module level functions draw from the global state
+        return np.random
+    if isinstance(seed, np.random.RandomState):
+        return seed
+    return np.random.RandomState(np.random.MT19937(seed))
+
+
+def _permutation_seeds(seed, permutations, n_jobs):
+    """Seed each permutation with its own child of ``SeedSequence(seed)``,
+    or of ``seed`` itself when it already is a ``SeedSequence``.
+
+    Only a serial, unseeded run keeps drawing from the global state.
+    """
+    if seed is None and n_jobs == 1:
+        return [None] * permutations
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(permutations)
+
+
+def _n_jobs(n_jobs):
+    return os.cpu_count() if n_jobs == -1 else n_jobs
+
+
+# the RandomRegion arguments shared by every permutation, set in each worker
+_worker = {}
+
+
+def _init_worker(args):
+    """Process pool initializer storing the ``RandomRegion`` arguments."""
+    _worker["args"] = args
+    _worker["index"] = {area: i for i, area in enumerate(args[0])}
+
+
+def _region_worker(seed):
+    return RandomRegion(*_worker["args"], seed=seed)
+
+
+def _labels_worker(seed):
+    return _region_worker(seed).get_labels(_worker["index"])
+
+
+def iter_random_labels(
+    area_ids,
+    num_regions=None,
+    cardinality=None,
+    contiguity=None,
+    maxiter=100,
+    compact=False,
+    max_swaps=1000000,
+    permutations=99,
+    seed=None,
+    n_jobs=1,
+):
+    """Generate random regionalizations one at a time as label vectors.
+
+    Unlike ``RandomRegions``, which keeps every ``RandomRegion`` it builds,
+    each solution is reduced to a compact label vector and discarded, so
+    memory stays constant in the number of permutations.
+
+    Parameters
+    ----------
+
+    area_ids : list
+        The IDs indexing the areas to be grouped into regions (must be in
+        the same order as spatial weights matrix if this is provided).
+    num_regions : int (default None)
+        The number of regions to generate.
+    cardinality : list (default None)
+        A list containing the number of areas to assign to regions.
+    contiguity : libpysal.weights.W (default None)
+        A spatial weights object (if ``None`` then contiguity will be ignored).
+    maxiter : int (default 100)
+        The maximum number attempts (for each permutation) at finding
+        a feasible solution (only affects contiguity constrained regions).
+    compact : bool (default False)
+        Attempt to build compact regions (only affects contiguity constrained regions).
+    max_swaps : int (default 1000000)
+        The maximum number of swaps to find a feasible solution
+        (only affects contiguity constrained regions).
+    permutations : int (default 99)
+        The number of label vectors to generate.
+    seed : {int, numpy.random.SeedSequence} (default None)
+        Entropy for ``numpy.random.SeedSequence``. Permutation ``k`` draws from
+        the ``k``-th spawned child, so it is the same for any ``n_jobs``. If
+        ``None`` and ``n_jobs`` is ``1``, the global ``numpy.random`` state is
+        used instead.
+    n_jobs : int (default 1)
+        The number of processes generating permutations. If ``-1``, then the
+        number of jobs is set to the number of CPU cores. Permutations are
+        still yielded in order, a few batches at a time.
+
+    Yields
+    ------
+
+    labels : numpy.ndarray
+        An ``int32`` array of shape ``(len(area_ids),)`` with the region of
+        each area, in the order of ``area_ids``. Areas of an infeasible
+        solution are labelled ``-1``.
+
+    Examples
+    --------
+
+    >>> import libpysal
+    >>> import numpy
+    >>> from spopt.region.random_region import iter_random_labels
+    >>> w = libpysal.weights.lat2W(10, 10, rook=True)
+    >>> numpy.random.seed(100)
+    >>> labels = next(iter_random_labels(w.id_order, contiguity=w))
+    >>> labels.shape, labels.dtype
+    ((100,), dtype('int32'))
+
+    """
+
+    args = (area_ids, num_regions, cardinality, contiguity, maxiter, compact, max_swaps)
+    n_jobs = _n_jobs(n_jobs)
+    seeds = _permutation_seeds(seed, permutations, n_jobs)
+    if n_jobs == 1:
+        index = {area: i for i, area in enumerate(area_ids)}
+        for permutation_seed in seeds:
+            yield RandomRegion(*args, seed=permutation_seed).get_labels(index)
+        return
+    # submit a bounded window of permutations at a time so memory stays constant
+    window = 16 * n_jobs
+    with ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=_init_worker, initargs=(args,)
+    ) as pool:
+        for start in range(0, permutations, window):
+            yield from pool.map(_labels_worker, seeds[start : start + window])
+
+
+def random_labels(
+    area_ids,
+    num_regions=None,
+    cardinality=None,
+    contiguity=None,
+    maxiter=100,
+    compact=False,
+    max_swaps=1000000,
+    permutations=99,
+    out=None,
+    seed=None,
+    n_jobs=1,
+):
+    """Generate random regionalizations into a ``(permutations, n)`` array.
+
+    Parameters
+    ----------
+
+    area_ids, num_regions, cardinality, contiguity, maxiter, compact, max_swaps,
+    permutations, seed, n_jobs
+        As in ``iter_random_labels``.
+    out : numpy.ndarray (default None)
+        An integer array of shape ``(permutations, len(area_ids))`` to write the
+        labels into, such as a ``numpy.memmap`` or the result of
+        ``numpy.lib.format.open_memmap``, so that all permutations need not fit
+        in memory. If ``None``, a new ``int32`` array is allocated.
+
+    Returns
+    -------
+
+    out : numpy.ndarray
+        The label vectors of the permutations, one per row, as yielded by
+        ``iter_random_labels``.
+
+    """
+
+    shape = (permutations, len(area_ids))
+    if out is None:
+        out = np.empty(shape, dtype=np.int32)
+    elif out.shape != shape:
+        raise ValueError(f"`out` has shape {out.shape}, expected {shape}.")
+    labels = iter_random_labels(
+        area_ids,
+        num_regions,
+        cardinality,
+        contiguity,
+        maxiter,
+        compact,
+        max_swaps,
+        permutations,
+        seed=seed,
+        n_jobs=n_jobs,
+    )
+    for i, row in enumerate(labels):
+        out[i] = row
+    return out
 
 
 class RandomRegions:
@@ -45,6 +240,14 @@ class RandomRegions:
         (only affects contiguity constrained regions).
     permutations : int (default 99)
         The number of ``RandomRegion`` instances to generate.
+    seed : {int, numpy.random.SeedSequence} (default None)
+        Entropy for ``numpy.random.SeedSequence``. Permutation ``k`` draws from
+        the ``k``-th spawned child, so it is the same for any ``n_jobs``. If
+        ``None`` and ``n_jobs`` is ``1``, the global ``numpy.random`` state is
+        used instead.
+    n_jobs : int (default 1)
+        The number of processes generating permutations. If ``-1``, then the
+        number of jobs is set to the number of CPU cores.
 
     Attributes
     ----------
@@ -140,20 +343,33 @@ class RandomRegions:
         compact=False,
         max_swaps=1000000,
         permutations=99,
+        seed=None,
+        n_jobs=1,
     ):
-        solutions = []
-        for _i in range(permutations):
-            solutions.append(
-                RandomRegion(
-                    area_ids,
-                    num_regions,
-                    cardinality,
-                    contiguity,
-                    maxiter,
-                    compact,
-                    max_swaps,
+        args = (
+            area_ids,
+            num_regions,
+            cardinality,
+            contiguity,
+            maxiter,
+            compact,
+            max_swaps,
+        )
+        n_jobs = _n_jobs(n_jobs)
+        seeds = _permutation_seeds(seed, permutations, n_jobs)
+        if n_jobs == 1:
+            solutions = [RandomRegion(*args, seed=s) for s in seeds]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=n_jobs, initializer=_init_worker, initargs=(args,)
+            ) as pool:
+                solutions = list(
+                    pool.map(
+                        _region_worker,
+                        seeds,
+                        chunksize=max(1, permutations // (4 * n_jobs)),
+                    )
                 )
-            )
         self.solutions = solutions
         self.solutions_feas = []
         for i in solutions:
@@ -189,6 +405,9 @@ class RandomRegion:
     max_swaps : int (default 1000000)
         The maximum number of swaps to find a feasible solution
         (only affects contiguity constrained regions).
+    seed : {int, numpy.random.SeedSequence, numpy.random.RandomState} (default None)
+        Seed of an ``MT19937`` generator, or the ``RandomState`` to draw from.
+        If ``None``, the global ``numpy.random`` state is used.
 
     Attributes
     ----------
@@ -269,6 +488,9 @@ class RandomRegion:
 
     """
 
+    # the generator outside of ``__init__``, which holds it only while building
+    _rng = np.random
+
     def __init__(
         self,
         area_ids,
@@ -278,10 +500,12 @@ class RandomRegion:
         maxiter=1000,
         compact=False,
         max_swaps=1000000,
+        seed=None,
     ):
+        self._rng = _random_state(seed)
         self.n = len(area_ids)
         ids = copy.copy(area_ids)
-        self.ids = list(np.random.permutation(ids))
+        self.ids = list(self._rng.permutation(ids))
         self.area_ids = area_ids
         self.regions = []
         self.feasible = True
@@ -349,14 +573,43 @@ class RandomRegion:
             num_regions = self.get_num_regions()
             region_breaks = self.get_region_breaks(num_regions)
             self.build_noncontig_regions(num_regions, region_breaks)
+        # keep the generator off the solution, so it pickles and stays small
+        del self._rng
+
+    def get_labels(self, index=None):
+        """Region of each area as a compact label vector.
+
+        Parameters
+        ----------
+
+        index : dict (default None)
+            A mapping from each area ID to its position in ``area_ids``, built
+            if ``None``. Pass it in when labelling many solutions.
+
+        Returns
+        -------
+
+        labels : numpy.ndarray
+            An ``int32`` array of shape ``(n,)`` with the position in
+            ``regions`` of each area in ``area_ids``, or ``-1`` for areas in
+            no region, as in infeasible solutions.
+
+        """
+
+        if index is None:
+            index = {area: i for i, area in enumerate(self.area_ids)}
+        labels = np.full(self.n, -1, dtype=np.int32)
+        for label, region in enumerate(self.regions):
+            labels[[index[area] for area in region]] = label
+        return labels
 
     def get_num_regions(self):
-        return np.random.randint(2, self.n)
+        return self._rng.randint(2, self.n)
 
     def get_region_breaks(self, num_regions):
         region_breaks = set()
         while len(region_breaks) < num_regions - 1:
-            region_breaks.add(np.random.randint(1, self.n - 1))
+            region_breaks.add(self._rng.randint(1, self.n - 1))
         region_breaks = list(region_breaks)
         region_breaks.sort()
         return region_breaks
@@ -390,45 +643,49 @@ class RandomRegion:
     def grow_compact(self, w, test_card, region, candidates, potential):
         # try to build a compact region by exhausting all existing
         # potential areas before adding new potential areas
+        queued = self._queued
         add_areas = []
         while potential and len(region) < test_card:
-            pot_index = np.random.randint(0, len(potential))
-            add_area = potential[pot_index]
+            pot_index = self._rng.randint(0, len(potential))
+            add_area = potential.pop(pot_index)
             region.append(add_area)
-            candidates.remove(add_area)
-            potential.remove(add_area)
+            del candidates[add_area]
+            queued[add_area] = False
             add_areas.append(add_area)
         for i in add_areas:
-            potential.extend(
-                [
-                    j
-                    for j in w.neighbors[i]
-                    if j not in region and j not in potential and j in candidates
-                ]
-            )
+            # areas in candidates are never in the region already
+            for j in w.neighbors[i]:
+                if j in candidates and not queued[j]:
+                    queued[j] = True
+                    potential.append(j)
         return region, candidates, potential
 
     def grow_free(self, w, test_card, region, candidates, potential):  # noqa: ARG002
         # increment potential areas after each new area is
         # added to the region (faster than the grow_compact)
-        pot_index = np.random.randint(0, len(potential))
-        add_area = potential[pot_index]
+        pot_index = self._rng.randint(0, len(potential))
+        add_area = potential.pop(pot_index)
         region.append(add_area)
-        candidates.remove(add_area)
-        potential.remove(add_area)
-        potential.extend(
-            [
-                i
-                for i in w.neighbors[add_area]
-                if i not in region and i not in potential and i in candidates
-            ]
-        )
+        del candidates[add_area]
+        queued = self._queued
+        queued[add_area] = False
+        for i in w.neighbors[add_area]:
+            if i in candidates and not queued[i]:
+                queued[i] = True
+                potential.append(i)
         return region, candidates, potential
 
     def build_contig_regions(
         self, num_regions, cardinality, w, maxiter, compact, max_swaps
     ):
         grow_region = self.grow_compact if compact else self.grow_free
+        # work on the positions of the areas, with an ordered pool of candidates
+        # and a mask of the areas queued as potential additions to a region
+        area_ids = list(self.area_ids)
+        index = {area: i for i, area in enumerate(area_ids)}
+        adjacency = _Adjacency(w, index)
+        contiguity = Contiguity(adjacency.indptr, adjacency.indices)
+        self._queued = queued = bytearray(self.n)
         _iter = 0
         while _iter < maxiter:
             # regionalization setup
@@ -440,7 +697,8 @@ class RandomRegion:
             swap_count = 0
             cards = copy.copy(cardinality)
             cards.sort()  # try to build largest regions first (pop from end of list)
-            candidates = copy.copy(self.ids)  # these are already shuffled
+            # these are already shuffled
+            candidates = OrderedDict.fromkeys(index[area] for area in self.ids)
 
             # begin building regions
             while candidates and swap_count < max_swaps:
@@ -457,9 +715,11 @@ class RandomRegion:
                     swap_in = None  # area to become new candidate
                     while swap_in is None:  # PEP8 E711
                         swap_count += 1
-                        swap_out = candidates.pop(0)  # area to remove from candidates
-                        swap_neighs = copy.copy(w.neighbors[swap_out])
-                        swap_neighs = list(np.random.permutation(swap_neighs))
+                        # area to remove from candidates
+                        swap_out, _ = candidates.popitem(last=False)
+                        swap_neighs = list(
+                            self._rng.permutation(adjacency.neighbors[swap_out])
+                        )
                         # select area to add to candidates
                         # -- (i.e. remove from an existing region)
                         for i in swap_neighs:
@@ -467,38 +727,42 @@ class RandomRegion:
                                 join = i  # area linking swap_in to swap_out
                                 swap_index = area2region[join]
                                 swap_region = regions[swap_index]
-                                swap_region = list(np.random.permutation(swap_region))
-                                for j in swap_region:
-                                    # test to ensure region
-                                    # connectivity after removing area
-                                    swap_region_test = swap_region[:] + [swap_out]
-                                    if check_contiguity(w, swap_region_test, j):
+                                swap_region = list(self._rng.permutation(swap_region))
+                                # test to ensure region connectivity after
+                                # removing each area, with swap_out in its place
+                                removable = contiguity.removable(
+                                    swap_region + [swap_out]
+                                )
+                                for j, ok in zip(swap_region, removable, strict=False):
+                                    if ok:
                                         swap_in = j
                                         break
                             if swap_in is not None:  # PEP8 E711
                                 break
                         else:
-                            candidates.append(swap_out)
+                            candidates[swap_out] = None
                     # swapping cleanup
                     regions[swap_index].remove(swap_in)
                     regions[swap_index].append(swap_out)
                     area2region.pop(swap_in)
                     area2region[swap_out] = swap_index
-                    candidates.append(swap_in)
+                    candidates[swap_in] = None
                     counter = 0
 
                 # setup to build a single region
                 building = True
-                seed = candidates.pop(0)
+                seed, _ = candidates.popitem(last=False)
                 region = [seed]
-                potential = [i for i in w.neighbors[seed] if i in candidates]
+                potential = [i for i in adjacency.neighbors[seed] if i in candidates]
+                for i in potential:
+                    queued[i] = True
                 test_card = cards.pop()
 
                 # begin building single region
                 while building and len(region) < test_card:
                     if potential:
                         region, candidates, potential = grow_region(
-                            w, test_card, region, candidates, potential
+                            adjacency, test_card, region, candidates, potential
                         )
                     else:
                         # not enough potential neighbors to reach test_card size
@@ -509,8 +773,10 @@ class RandomRegion:
                             cards.remove(len(region))
                         else:
                             # constructed region doesn't match a candidate region size
-                            candidates.extend(region)
+                            candidates.update(dict.fromkeys(region))
                             region = []
+                for i in potential:
+                    queued[i] = False
 
                 # cleanup when successful region built
                 if region:
@@ -522,11 +788,37 @@ class RandomRegion:
             # handling of regionalization result
             if len(regions) < num_regions:
                 # regionalization failed
-                self.ids = list(np.random.permutation(self.ids))
+                self.ids = list(self._rng.permutation(self.ids))
                 regions = []
                 _iter += 1
             else:
                 # regionalization successful
                 self.feasible = True
                 _iter = maxiter
-        self.regions = regions
+        del self._queued
+        self.regions = [[area_ids[i] for i in region] for region in regions]
+
+
+class _Adjacency:
+    """Neighbors of each area by position, in the order of ``w.neighbors``,
+    held as CSR arrays for ``Contiguity``.
+
+    Parameters
+    ----------
+
+    w : libpysal.weights.W
+        A spatial weights object.
+    index : dict
+        A mapping from each area ID in ``w`` to its position.
+
+    """
+
+    def __init__(self, w, index):
+        # lists per position, looked up like the ``neighbors`` of a W
+        self.neighbors = [[index[j] for j in w.neighbors[area]] for area in index]
+        self.indptr = np.cumsum([0] + [len(alters) for alters in self.neighbors])
+        self.indices = np.fromiter(
+            (j for alters in self.neighbors for j in alters),
+            dtype=np.intp,
+            count=self.indptr[-1],
+        )
@@ -8,24 +8,26 @@ K-means with the constraint that all clusters form a spatially connected compone
 __author__ = "Serge Rey"
 __email__ = "sjsrey@gmail.com"
 
-
-from collections import defaultdict
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappop, heappush
+from multiprocessing import shared_memory
 
 import numpy
+from scipy import sparse
 
 from ..BaseClass import BaseSpOptHeuristicSolver
 from .base import (
+    ContiguityOracle,
     _centroid,
-    _closest,
+    _refresh_closest,
     _seeds,
-    move_ok,
-    ok_moves,
-    region_neighbors,
-    w_to_g,
+    _sq_distances,
 )
 
 
-def region_k_means(X, n_clusters, w, drop_islands=True, seed=0):  # noqa: N803
+def region_k_means(X, n_clusters, w, drop_islands=True, seed=0):  # noqa: N803, ARG001
     """Solve the region-K-means problem with the constraint
     that each cluster forms a spatially connected component.
 
@@ -36,11 +38,12 @@ def region_k_means(X, n_clusters, w, drop_islands=True, seed=0):  # noqa: N803
         The observations to cluster shaped ``(n_samples, n_features)``.
     n_clusters : int
         The number of clusters to form.
-    w : libpysal.weights.W
-        Weights object created from given data.
+    w : libpysal.weights.W, scipy.sparse matrix
+        Weights object created from given data, or its sparse adjacency.
     drop_islands : bool
-        Drop observations that are islands (``True``) or keep them (``False``).
-        Default is ``True``.
+        Retained for backwards compatibility. Regions grow along the edges of
+        ``w``, so an island is only ever assigned when it is drawn as a seed,
+        whatever the value of ``drop_islands``. Default is ``True``.
     seed : int
         Random state to pass into ``_seeds()``. Default is ``0``.
 
@@ -56,79 +59,205 @@ def region_k_means(X, n_clusters, w, drop_islands=True, seed=0):  # noqa: N803
     iters : int
         The number of iterations for the reassignment phase.
 
+    Raises
+    ------
+
+    ValueError
+        If some areas cannot be reached from any seed, such as islands or
+        connected components of ``w`` holding no seed.
+
     """
 
-    data = X
-    a_list = w.to_adjlist(remove_symmetric=False, drop_islands=drop_islands)
-    areas = numpy.arange(w.n).astype(int)
+    data = numpy.asarray(X, dtype=float)
+    n = data.shape[0]
+    areas = numpy.arange(n).astype(int)
     k = n_clusters
     seeds = _seeds(areas, k, seed)
 
     # initial assignment phase
-    label = numpy.array([-1] * w.n).astype(int)
-    for i, seed in enumerate(seeds):
-        label[seed] = i
-    to_assign = areas[label == -1]
-    while to_assign.size > 0:
-        assignments = defaultdict(list)
+    label = numpy.array([-1] * n).astype(int)
+    label[seeds] = numpy.arange(k)
+    oracle = ContiguityOracle(w, label)
+    # each round, every region bids for the unassigned area on its frontier
+    # closest to its running centroid, and contested areas go to the closest
+    sums = data[seeds].copy()
+    sizes = numpy.ones(k, dtype=int)
+    centers = sums.copy()
+    # a lazy heap per region holds its frontier, keyed by a lower bound on the
+    # distance of each area to the running centroid
+    drift = [0.0] * k
+    version = [0] * k
+    heaps = [[] for _ in range(k)]
+    frontiers = [set() for _ in range(k)]
+    for rid, s in enumerate(seeds):
+        _push_frontier(
+            heaps[rid], frontiers[rid], oracle.neighbors(s), data, label, centers[rid]
+        )
+    # the bid of each region, kept while its centroid and frontier are unchanged
+    bests = [None] * k
+    n_unassigned = n - k
+    while n_unassigned > 0:
+        bids = {}
         for rid in range(k):
-            region = areas[label == rid]
-            neighbors = region_neighbors(a_list, region)
-            neighbors = [j for j in neighbors if j in to_assign]
-            if neighbors:
-                d_min = numpy.inf
-                centroid = data[region].mean(axis=0)
-                for neighbor in neighbors:
-                    d = ((data[neighbor] - centroid) ** 2).sum()
-                    if d < d_min:
-                        idx = neighbor
-                        d_min = d
-                assignments[idx].append([rid, d_min])
-        for key in assignments:
-            assignment = assignments[key]
-            if len(assignment) == 1:
-                r, d = assignment[0]
-                label[key] = r
-            else:
-                d_min = numpy.inf
-                for match in assignment:
-                    r, d = match
-                    if d < d_min:
-                        idx = r
-                        d_min = d
-                label[key] = idx
-
-        to_assign = areas[label == -1]
+            best = bests[rid]
+            if best is None or label[best[1]] != -1:
+                best = bests[rid] = _pop_closest(
+                    heaps[rid], data, label, centers[rid], drift[rid], version[rid]
+                )
+            if best is None:
+                continue
+            d, idx = best
+            if idx not in bids or d < bids[idx][1]:
+                bids[idx] = (rid, d)
+        if not bids:
+            raise ValueError(
+                f"{n_unassigned} areas cannot be reached from any seed. "
+                "Every connected component of `w` needs at least one region."
+            )
+        for idx, (rid, _) in bids.items():
+            label[idx] = rid
+            sums[rid] += data[idx]
+            sizes[rid] += 1
+            center = sums[rid] / sizes[rid]
+            drift[rid] += math.sqrt(((center - centers[rid]) ** 2).sum())
+            version[rid] += 1
+            centers[rid] = center
+            bests[rid] = None
+            _push_frontier(
+                heaps[rid],
+                frontiers[rid],
+                oracle.neighbors(idx),
+                data,
+                label,
+                center,
+                drift[rid],
+                version[rid],
+            )
+        n_unassigned -= len(bids)
 
     # reassignment phase
-    g = w_to_g(w)
-
     iters = 1
 
     # want to loop this until candidates is empty
     regions = [areas[label == r].tolist() for r in range(k)]
     centroid = _centroid(regions, data)
-    closest = numpy.array(_closest(data, centroid))
-    candidates = areas[closest != label]
-    candidates = ok_moves(candidates, regions, label, closest, g, w, areas)
+    # running sums give the new centroids of the two regions touched by a move,
+    # and only their columns of the distances need recomputing
+    sizes = numpy.bincount(label, minlength=k)
+    sums = centroid * sizes[:, None]
+    distances = _sq_distances(data, centroid)
+    closest = distances.argmin(axis=1)
+    candidates = [a for a in areas[closest != label] if oracle.move_ok(a, closest[a])]
     while candidates:
         area = candidates.pop()
         # need to check move doesn't break component
-        source = areas[label == label[area]]
-        destination = areas[label == closest[area]]
-        if move_ok(area, source, destination, g, w):
+        if oracle.move_ok(area, closest[area]):
             # make move and update assignments, centroids, closest, candidates
-            label[area] = closest[area]
-            regions = [areas[label == r].tolist() for r in range(k)]
-            centroid = _centroid(regions, data)
-            closest = numpy.array(_closest(data, centroid))
-            candidates = areas[closest != label]
-            candidates = ok_moves(candidates, regions, label, closest, g, w, areas)
+            moved = [label[area], closest[area]]
+            oracle.move(area, closest[area])
+            sums[moved[0]] -= data[area]
+            sums[moved[1]] += data[area]
+            sizes[moved] += [-1, 1]
+            centroid[moved] = sums[moved] / sizes[moved, None]
+            _refresh_closest(data, centroid, distances, closest, moved)
+            candidates = [
+                a for a in areas[closest != label] if oracle.move_ok(a, closest[a])
+            ]
         iters += 1
 
     return centroid, label, iters
 
 
+def _push_frontier(heap, frontier, areas, data, label, center, drift=0.0, version=0):
+    """Score the unassigned ``areas`` new to a region's frontier and push them.
+
+    An area scored at distance :math:`d` is keyed by :math:`\\sqrt{d}` plus the
+    region's ``drift``, the total distance its centroid has moved, so that the
+    key less the current drift stays a lower bound on its distance after any
+    later move of the centroid.
+    """
+    areas = [j for j in areas.tolist() if label[j] == -1 and j not in frontier]
+    if not areas:
+        return
+    frontier.update(areas)
+    d = ((data[areas] - center) ** 2).sum(axis=1)
+    for j, dj in zip(areas, d.tolist(), strict=True):
+        heappush(heap, (math.sqrt(dj) + drift, j, version, dj))
+
+
+def _pop_closest(heap, data, label, center, drift, version):
+    """The squared distance and index of the unassigned frontier area closest
+    to ``center``, the lowest index among ties, or ``None`` if there is none.
+
+    Assigned areas are dropped, and areas scored against an older centroid
+    are rescored only when their lower bound could beat the closest area found.
+    """
+    best = None
+    popped = []
+    while heap:
+        key, j, scored, d = heap[0]
+        if label[j] != -1:
+            heappop(heap)
+            continue
+        # margin for rounding in the keys, so that ties are all examined
+        if best is not None and key - drift > math.sqrt(best[0]) * (1 + 1e-9) + 1e-12:
+            break
+        heappop(heap)
+        if scored != version:
+            d = float(((data[j] - center) ** 2).sum())
+        popped.append((math.sqrt(d) + drift, j, version, d))
+        if best is None or (d, j) < best:
+            best = (d, j)
+    for entry in popped:
+        heappush(heap, entry)
+    return best
+
+
+def _inertia(data, centroid, label):
+    """Within-region sum of squared distances to the region centroids."""
+    return float(((data - centroid[label]) ** 2).sum())
+
+
+def _share(array):
+    """Copy an array into a new shared memory block.
+
+    Returns the block, which the caller must close and unlink, and the
+    ``(name, shape, dtype)`` needed to attach to it.
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    numpy.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+# the data and adjacency of the problem, attached in each worker process
+_shared = {}
+
+
+def _attach(data, indptr, indices):
+    """Process pool initializer attaching to the shared problem arrays."""
+    views = []
+    for name, shape, dtype in (data, indptr, indices):
+        block = shared_memory.SharedMemory(name=name)
+        views.append(numpy.ndarray(shape, dtype=dtype, buffer=block.buf))
+        # keep the blocks open for the lifetime of the worker
+        _shared.setdefault("blocks", []).append(block)
+    data, indptr, indices = views
+    _shared["data"] = data
+    _shared["adjacency"] = sparse.csr_matrix(
+        (numpy.ones(indices.shape[0], dtype=bool), indices, indptr),
+        shape=(data.shape[0], data.shape[0]),
+    )
+
+
+def _solve_shared(n_clusters, seed):
+    """Solve one run of region k-means on the shared problem."""
+    data = _shared["data"]
+    centroid, label, iters = region_k_means(
+        data, n_clusters, _shared["adjacency"], seed=seed
+    )
+    return centroid, label, iters, _inertia(data, centroid, label)
+
+
 class RegionKMeansHeuristic(BaseSpOptHeuristicSolver):
     """Solve the region-K-means problem with the constraint
     that each cluster forms a spatially connected component.
@@ -144,10 +273,20 @@ class RegionKMeansHeuristic(BaseSpOptHeuristicSolver):
     w : libpysal.weights.W, required
         Weights object created from given data.
     drop_islands : bool
-        Drop observations that are islands (``True``) or keep them (``False``).
-        Default is ``True``.
+        Retained for backwards compatibility, and ignored. Regions grow along
+        the edges of ``w``, so an island is only ever assigned when it is drawn
+        as a seed, and otherwise ``solve`` raises a ``ValueError``. Default is
+        ``True``.
     seed : int
-        Random state to pass into ``_seeds()``. Default is ``0``.
+        Random state to pass into ``_seeds()``. Run ``i`` of ``n_init`` uses
+        ``seed + i``. Default is ``0``.
+    n_init : int
+        The number of runs from different seeds. The labeling with the
+        lowest within-region sum of squares is kept. Default is ``1``.
+    n_jobs : int
+        The number of processes running the ``n_init`` runs, which share the
+        data and adjacency through shared memory. If ``-1``, then the number
+        of jobs is set to the number of CPU cores. Default is ``1``.
 
     Attributes
     ----------
@@ -159,26 +298,73 @@ class RegionKMeansHeuristic(BaseSpOptHeuristicSolver):
        found at the last iteration of ``region_k_means``.
     iters_ : int
         The number of iterations for the reassignment phase.
+    inertia_ : float
+        The within-region sum of squared distances to the centroids.
+    run_seeds_ : numpy.ndarray
+        The seed of each run.
+    run_inertias_ : numpy.ndarray
+        The within-region sum of squares of each run.
+    run_iters_ : numpy.ndarray
+        The number of reassignment iterations of each run.
 
     """
 
-    def __init__(self, data, n_clusters, w, drop_islands=True, seed=0):
+    def __init__(
+        self, data, n_clusters, w, drop_islands=True, seed=0, n_init=1, n_jobs=1
+    ):
         self.data = data
         self.w = w
         self.n_clusters = n_clusters
         self.drop_islands = drop_islands
         self.seed = seed
+        self.n_init = n_init
+        self.n_jobs = n_jobs
 
     def solve(self):
         """Solve the region k-means heuristic."""
-        centroid, label, iters = region_k_means(
-            self.data,
-            self.n_clusters,
-            self.w,
-            drop_islands=self.drop_islands,
-            seed=self.seed,
-        )
-
-        self.labels_ = label
-        self.centroids_ = centroid
-        self.iters_ = iters
+        data = numpy.asarray(self.data, dtype=float)
+        seeds = [self.seed + i for i in range(self.n_init)]
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        if n_jobs == 1 or self.n_init == 1:
+            runs = []
+            for seed in seeds:
+                centroid, label, iters = region_k_means(
+                    data,
+                    self.n_clusters,
+                    self.w,
+                    drop_islands=self.drop_islands,
+                    seed=seed,
+                )
+                runs.append((centroid, label, iters, _inertia(data, centroid, label)))
+        else:
+            adjacency = self.w.sparse if hasattr(self.w, "sparse") else self.w
+            adjacency = sparse.csr_matrix(adjacency)
+            blocks = []
+            try:
+                shared = []
+                for array in (data, adjacency.indptr, adjacency.indices):
+                    block, spec = _share(array)
+                    blocks.append(block)
+                    shared.append(spec)
+                with ProcessPoolExecutor(
+                    max_workers=min(n_jobs, self.n_init),
+                    initializer=_attach,
+                    initargs=tuple(shared),
+                ) as pool:
+                    runs = list(
+                        pool.map(_solve_shared, [self.n_clusters] * self.n_init, seeds)
+                    )
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+
+        centroids, labels, iters, inertias = zip(*runs, strict=True)
+        best = int(numpy.argmin(inertias))
+        self.labels_ = labels[best]
+        self.centroids_ = centroids[best]
+        self.iters_ = iters[best]
+        self.inertia_ = inertias[best]
+        self.run_seeds_ = numpy.array(seeds)
+        self.run_inertias_ = numpy.array(inertias)
+        self.run_iters_ = numpy.array(iters)
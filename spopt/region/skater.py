@@ -1,19 +1,164 @@
 # ruff: noqa: C408, B006, E731, N803, N806
 
 import copy
+import hashlib
+import logging
+import os
+import threading
 import time
 import warnings
-from collections import namedtuple
+import weakref
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
+from scipy import sparse
 from scipy.optimize import OptimizeWarning
 from scipy.sparse import csgraph as cg
 from sklearn.metrics import pairwise as skm
 
 from ..BaseClass import BaseSpOptHeuristicSolver
+from .csgraph_utils import kruskal_forest
 
 deletion = namedtuple("deletion", ("in_node", "out_node", "score"))
 
+logger = logging.getLogger(__name__)
+
+# distances between matching rows, for the dissimilarities along the edges
+_PAIRED_DISTANCES = {
+    skm.manhattan_distances: skm.paired_manhattan_distances,
+    skm.euclidean_distances: skm.paired_euclidean_distances,
+    skm.cosine_distances: skm.paired_cosine_distances,
+}
+
+# caches derived from each weights object, keyed by its id and dropped with
+# it, so that nothing is ever set on the caller's weights
+_weights_caches = {}
+_weights_cache_lock = threading.Lock()
+
+
+def _weights_cache(W):
+    """
+    The dictionary of cached structures derived from a weights object.
+    """
+    key = id(W)
+    with _weights_cache_lock:
+        cache = _weights_caches.get(key)
+        if cache is None:
+            cache = _weights_caches[key] = {}
+            weakref.finalize(W, _weights_caches.pop, key, None)
+    return cache
+
+
+def _check_forest(MSF, W):
+    """
+    Check that a precomputed forest spans the binary adjacency ``W``.
+
+    Parameters
+    ----------
+
+    MSF : scipy.sparse.csr_matrix
+        A spanning forest, with each edge stored in either or both triangles.
+    W : scipy.sparse.csr_matrix
+        The binary adjacency the forest must span.
+
+    Returns
+    -------
+
+    scipy.sparse.csr_matrix
+        The forest with each edge stored once, in the upper triangle, as the
+        cuts expect.
+
+    """
+    if MSF.shape != W.shape:
+        raise ValueError(f"`MSF` has shape {MSF.shape}, expected {W.shape}.")
+    edges = sparse.triu(MSF + MSF.T, k=1, format="csr")
+    edges.eliminate_zeros()
+    if edges.multiply(W).nnz != edges.nnz:
+        raise ValueError("`MSF` has edges that are not in the weights.")
+    n_components = cg.connected_components(W, directed=False, return_labels=False)
+    if edges.nnz != W.shape[0] - n_components or n_components != (
+        cg.connected_components(edges, directed=False, return_labels=False)
+    ):
+        raise ValueError("`MSF` is not a spanning forest of the weights.")
+    return edges
+
+
+def _subtree_sizes(MSF, labels):
+    """
+    Root each tree of a spanning forest and count the nodes below every node.
+
+    Parameters
+    ----------
+
+    MSF : scipy.sparse.csr_matrix
+        An :math:`(N,N)` adjacency matrix for the minimum spanning forest.
+    labels : numpy.array
+        An :math:`(N,)` vector of component labels for ``MSF``.
+
+    Returns
+    -------
+
+    parents : numpy.array
+        An :math:`(N,)` vector with the parent of each node in the rooted forest,
+        or ``-9999`` for the root of each tree.
+    sizes : numpy.array
+        An :math:`(N,)` vector with the number of nodes in the subtree
+        hanging below (and including) each node.
+
+    """
+    n = MSF.shape[0]
+    parents = np.full(n, -9999, dtype=np.int64)
+    orders = []
+    roots = np.unique(labels, return_index=True)[1]
+    for root in roots:
+        order, predecessors = cg.breadth_first_order(
+            MSF, root, directed=False, return_predecessors=True
+        )
+        parents[order] = predecessors[order]
+        orders.append(order)
+    sizes = np.ones(n, dtype=np.int64)
+    # accumulate children into their parents, from the leaves up
+    for node in np.concatenate(orders)[::-1]:
+        parent = parents[node]
+        if parent >= 0:
+            sizes[parent] += sizes[node]
+    return parents, sizes
+
+
+def _binary_sparse(W):
+    """
+    Binary CSR adjacency for a weights object, built without touching its
+    ``transform``. It is cached for ``W`` alongside the weighted sparse matrix
+    it was derived from, and rebuilt when that matrix changes.
+
+    Parameters
+    ----------
+
+    W : libpysal.weights.W, scipy.sparse.csr_matrix
+        A PySAL weights object, or a sparse matrix that is returned unchanged.
+
+    Returns
+    -------
+
+    scipy.sparse.csr_matrix
+        An :math:`(N,N)` matrix with ones for every neighbor pair in ``W``.
+
+    """
+    if sparse.issparse(W):
+        return W
+    weighted = W.sparse
+    cache = _weights_cache(W)
+    cached = cache.get("binary")
+    if cached is not None and cached[0] is weighted:
+        return cached[1]
+    csr = weighted.tocsr()
+    binary = sparse.csr_matrix(
+        (np.ones(csr.nnz), csr.indices, csr.indptr), shape=csr.shape
+    )
+    cache["binary"] = (weighted, binary)
+    return binary
+
 
 class SpanningForest:
     def __init__(
@@ -23,6 +168,9 @@ class SpanningForest:
         reduction=np.sum,
         center=np.mean,
         verbose=False,
+        mst="scipy",
+        callback=None,
+        forest_cache_size=8,
     ):
         """
         Initialize the SKATER algorithm.
@@ -31,7 +179,10 @@ class SpanningForest:
         ----------
 
         dissimilarity : callable (default sklearn.metrics.pairwise.manhattan_distances)
-            A callable distance metric.
+            A callable distance metric between the rows of two arrays. It is
+            only evaluated between neighbors in ``W``, a block of rows at a
+            time, and the paired form of the ``sklearn`` Manhattan, Euclidean,
+            and cosine distances is used along the edges directly.
         affinity : callable (default None)
             A callable affinity metric between 0 and 1, which is inverted to provide a
             dissimilarity metric. Either ``affinity`` or ``dissimilarity`` should be
@@ -44,6 +195,31 @@ class SpanningForest:
             Flag for how much output to provide to the user,
             in terms of print statements and progress bars. Set to ``1`` for
             minimal output and ``2`` for full output.
+        mst : str, callable (default 'scipy')
+            The backend used to build the minimum spanning forest of the
+            dissimilarity graph. ``'scipy'`` uses
+            ``scipy.sparse.csgraph.minimum_spanning_tree``, ``'kruskal'`` uses
+            ``spopt.region.csgraph_utils.kruskal_forest``, a union-find over the
+            edge list and its dissimilarities that never builds the sparse
+            dissimilarity graph, and a callable must take the sparse
+            dissimilarity graph and return the sparse spanning forest.
+        callback : callable, logging.Logger (default None)
+            Destination for instrumentation events emitted during ``fit``. Each
+            event is a ``dict`` with an ``'event'`` key naming it: ``'phase'``
+            events carry the ``'phase'`` (``'kernel'``, ``'mst'``, or
+            ``'components'``) and its ``'elapsed'`` seconds; ``'find_cut'``
+            events carry the ``'elapsed'`` seconds, ``'n_candidates'`` edges
+            considered, ``'n_evaluated'`` edges scored, ``'edges_per_second'``,
+            and the best ``'score'`` found; ``'cut'`` events carry the accepted
+            ``'in_node'``, ``'out_node'``, ``'score'``, and resulting
+            ``'n_subtrees'``; and a final ``'fit'`` event carries the total
+            ``'elapsed'`` seconds and ``'n_subtrees'``. A callable is called with
+            each event, while a logger receives them at ``INFO`` level with the
+            event in the ``skater_event`` attribute of the log record. If not
+            provided, events go to the ``spopt.region.skater`` logger.
+        forest_cache_size : int (default 8)
+            The number of minimum spanning forests kept per weights object, for
+            the most recently used data. ``0`` disables the cache.
 
         Notes
         -----
@@ -69,10 +245,25 @@ class SpanningForest:
         else:
             metric = lambda x, y: dissimilarity(x, y)
 
+        if mst == "scipy":
+            mst_builder = cg.minimum_spanning_tree
+        elif mst == "kruskal":
+            mst_builder = kruskal_forest
+        elif callable(mst):
+            mst_builder = mst
+        else:
+            raise ValueError(
+                f"`mst` must be 'scipy', 'kruskal', or a callable, not {mst!r}."
+            )
+
         self.metric = metric
+        self.mst = mst_builder
+        self._metric_key = (dissimilarity, affinity)
         self.reduction = reduction
         self.center = center
         self.verbose = verbose
+        self.callback = logger if callback is None else callback
+        self.forest_cache_size = forest_cache_size
 
     def __repr__(self):
         return (
@@ -88,6 +279,7 @@ class SpanningForest:
         quorum=-np.inf,
         trace=False,
         islands="increase",
+        MSF=None,
     ):
         """
 
@@ -96,10 +288,13 @@ class SpanningForest:
 
         n_clusters : int
             The number of clusters to form.
-        W : libpysal.weights.W
+        W : libpysal.weights.W, scipy.sparse.csr_matrix
             A PySAL weights object created from given data expressing the neighbor
             relationships between observations. It must be symmetric and binary, for
-            example: Queen/Rook, DistanceBand, or a symmetrized KNN.
+            example: Queen/Rook, DistanceBand, or a symmetrized KNN. ``W`` is not
+            modified: its binary adjacency is read without changing its
+            ``transform``, so it can be shared across threads. A sparse matrix is
+            used as-is, and must already be a symmetric binary adjacency.
         data : numpy.ndarray (default None)
             An array of shape :math:`(N,P)` with :math:`N`
             observations and :math:`P` features.
@@ -113,6 +308,14 @@ class SpanningForest:
             discover ``n_clusters`` regions, treating islands as their own regions. If
             "increase", the algorithm will discover ``n_clusters`` regions,
             treating islands as separate from ``n_clusters``.
+        MSF : scipy.sparse.csr_matrix (default None)
+            A precomputed minimum spanning forest of the dissimilarity graph for
+            ``W`` and ``data``, which must span ``W``. If not provided, a forest
+            cached for ``W`` and the same ``data`` is reused, or else one is built
+            with the ``mst`` backend. A built forest is cached for ``W`` under a
+            hash of ``data``, up to ``forest_cache_size`` forests per ``W``, so
+            repeated fits on the same data skip the kernel and the MST. A passed
+            forest is used for this fit only, and never cached.
 
         Notes
         -----
@@ -123,35 +326,58 @@ class SpanningForest:
         """
         if trace:
             self._trace = []
-        if data is None:
-            attribute_kernel = np.ones((W.n, W.n))
-            data = np.ones((W.n, 1))
+        forest_key = self._forest_key(data)
+        if MSF is None:
+            MSF = self._cached_forest(W, forest_key)
         else:
-            attribute_kernel = self.metric(data, None)
-        W.transform = "b"
-        W = W.sparse
-        start = time.time()
+            # a passed forest need not be minimal, so it is never cached
+            MSF = _check_forest(MSF, _binary_sparse(W))
 
+        start = time.time()
         super_verbose = self.verbose > 1
-        start_W = time.time()
-        dissim = W.multiply(attribute_kernel)
-        dissim.eliminate_zeros()
-        end_W = time.time() - start_W
+        if MSF is None:
+            W_input, W = W, _binary_sparse(W)
+            start_W = time.time()
+            # each edge once, and the dissimilarity along it only
+            edges = sparse.triu(W, k=1, format="csr")
+            rows = np.repeat(np.arange(W.shape[0]), np.diff(edges.indptr))
+            cols = edges.indices
+            if data is None:
+                dissim = np.ones(edges.nnz)
+            else:
+                dissim = self._edge_dissimilarity(data, rows, cols)
+            end_W = time.time() - start_W
+            self._emit("phase", phase="kernel", elapsed=end_W)
 
-        if super_verbose:
-            print(f"Computing Affinity Kernel took {end_W:.2f}s")
+            if super_verbose:
+                print(f"Computing Affinity Kernel took {end_W:.2f}s")
 
-        tree_time = time.time()
-        MSF = cg.minimum_spanning_tree(dissim)
-        tree_time = time.time() - tree_time
-        if super_verbose:
-            print(f"Computing initial MST took {tree_time:.2f}s")
+            tree_time = time.time()
+            if self.mst is kruskal_forest:
+                MSF = kruskal_forest(rows, cols, dissim, W.shape[0])
+            else:
+                dissim = sparse.csr_matrix((dissim, (rows, cols)), shape=W.shape)
+                dissim.eliminate_zeros()
+                MSF = self.mst(dissim + dissim.T).tocsr()
+            tree_time = time.time() - tree_time
+            self._emit("phase", phase="mst", elapsed=tree_time)
+            self._cache_forest(W_input, forest_key, MSF)
+            if super_verbose:
+                print(f"Computing initial MST took {tree_time:.2f}s")
+        else:
+            # cuts are made in place, so never prune the cached forest itself
+            MSF = MSF.copy().tocsr()
+            if super_verbose:
+                print("Reusing cached minimum spanning forest")
+        if data is None:
+            data = np.ones((MSF.shape[0], 1))
 
         init_component_time = time.time()
         current_n_subtrees, current_labels = cg.connected_components(
             MSF, directed=False
         )
         init_component_time = time.time() - init_component_time
+        self._emit("phase", phase="components", elapsed=init_component_time)
 
         if super_verbose:
             print(f"Computing connected components took {init_component_time:.2f}s.")
@@ -204,6 +430,13 @@ class SpanningForest:
                 MSF, current_n_subtrees, current_labels = self.make_cut(
                     *best_deletion, MSF=MSF
                 )
+                self._emit(
+                    "cut",
+                    in_node=int(best_deletion.in_node),
+                    out_node=int(best_deletion.out_node),
+                    score=best_deletion.score,
+                    n_subtrees=current_n_subtrees,
+                )
             # otherwise, it means the MSF admits no further cuts (no backtracking here)
             else:
                 current_n_subtrees, current_labels = cg.connected_components(
@@ -222,6 +455,9 @@ class SpanningForest:
                 self.current_labels_ = current_labels
                 self.minimum_spanning_forest_ = MSF
                 self._elapsed_time = time.time() - start
+                self._emit(
+                    "fit", elapsed=self._elapsed_time, n_subtrees=current_n_subtrees
+                )
                 return self
             if trace:
                 self._trace.append((current_labels, best_deletion))
@@ -229,8 +465,112 @@ class SpanningForest:
         self.current_labels_ = current_labels
         self.minimum_spanning_forest_ = MSF
         self._elapsed_time = time.time() - start
+        self._emit("fit", elapsed=self._elapsed_time, n_subtrees=current_n_subtrees)
         return self
 
+    def _emit(self, event, **fields):
+        """
+        Send an instrumentation event to the ``callback`` of the spanning forest.
+        """
+        payload = {"event": event, **fields}
+        if isinstance(self.callback, logging.Logger):
+            if self.callback.isEnabledFor(logging.INFO):
+                self.callback.info(
+                    "%s %s", event, fields, extra={"skater_event": payload}
+                )
+        else:
+            self.callback(payload)
+
+    def _edge_dissimilarity(self, data, rows, cols, chunk_size=2**10):
+        """
+        The dissimilarity between the two ends of each edge.
+
+        Parameters
+        ----------
+
+        data : numpy.ndarray
+            An array of shape :math:`(N,P)` with :math:`N`
+            observations and :math:`P` features.
+        rows, cols : numpy.ndarray
+            The ends of each edge, with ``rows`` sorted.
+        chunk_size : int (default 2**10)
+            The number of edges, or of rows for a metric with no paired form,
+            evaluated at once.
+
+        Returns
+        -------
+
+        numpy.ndarray
+            The dissimilarity along each edge.
+
+        """
+        data = np.asarray(data)
+        dissimilarity, affinity = self._metric_key
+        paired = _PAIRED_DISTANCES.get(dissimilarity) if affinity is None else None
+        dissim = np.empty(len(rows))
+        if paired is not None:
+            for start in range(0, len(rows), chunk_size):
+                stop = start + chunk_size
+                dissim[start:stop] = paired(
+                    data[rows[start:stop]], data[cols[start:stop]]
+                )
+            return dissim
+        # otherwise, a block of rows against only the areas they neighbor
+        bounds = np.searchsorted(rows, np.arange(0, data.shape[0], chunk_size))
+        bounds = np.append(bounds, len(rows))
+        for block, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:], strict=True)):
+            if lo == hi:
+                continue
+            start = block * chunk_size
+            alters = np.unique(cols[lo:hi])
+            block_dissim = self.metric(data[start : start + chunk_size], data[alters])
+            dissim[lo:hi] = block_dissim[
+                rows[lo:hi] - start, np.searchsorted(alters, cols[lo:hi])
+            ]
+        return dissim
+
+    def _forest_key(self, data):
+        """
+        Hash the attribute data, the metric, and the MST backend into a key
+        for the minimum spanning forests cached on the weights object.
+        """
+        if data is None:
+            digest = None
+        else:
+            data = np.ascontiguousarray(data)
+            digest = (
+                data.shape,
+                data.dtype.str,
+                hashlib.sha1(data.tobytes()).hexdigest(),
+            )
+        return (self._metric_key, self.mst, digest)
+
+    def _cached_forest(self, W, key):
+        """
+        The forest cached for ``W`` under ``key``, or ``None``.
+        """
+        forests = _weights_cache(W).get("forests")
+        with _weights_cache_lock:
+            if forests is None or key not in forests:
+                return None
+            forests.move_to_end(key)
+            return forests[key]
+
+    def _cache_forest(self, W, key, MSF):
+        """
+        Cache a copy of a forest for ``W``, evicting the least recently used
+        forests beyond ``forest_cache_size``.
+        """
+        if self.forest_cache_size <= 0:
+            return
+        cache = _weights_cache(W)
+        with _weights_cache_lock:
+            forests = cache.setdefault("forests", OrderedDict())
+            forests[key] = MSF.copy()
+            forests.move_to_end(key)
+            while len(forests) > self.forest_cache_size:
+                forests.popitem(last=False)
+
     def score(self, data, labels=None, quorum=-np.inf):
         """
         This yields a score for the data, given the labels provided.
@@ -359,9 +699,21 @@ class SpanningForest:
         current_n_subtrees, current_labels = cg.connected_components(
             MSF, directed=False
         )
+        search_time = time.time()
         best_deletion = deletion(np.nan, np.nan, np.inf)
+        candidates = np.vstack(MSF.nonzero()).T
+        n_candidates = len(candidates)
+        n_evaluated = 0
+        if np.isfinite(quorum):
+            # discard edges whose removal would leave a region below quorum
+            # before paying for any component labelling or scoring
+            candidates = candidates[
+                self._quorum_feasible(
+                    MSF, candidates, quorum, current_n_subtrees, current_labels
+                )
+            ]
         for in_node, out_node in tqdm(
-            np.vstack(MSF.nonzero()).T, desc="finding cut..."
+            candidates, desc="finding cut..."
         ):  # iterate over MSF edges
             if zero_in and labels[in_node] != target_label:
                 continue
@@ -384,14 +736,61 @@ class SpanningForest:
 
             # compute the score of these components
             score = self.score(data, labels=local_labels, quorum=quorum)
+            n_evaluated += 1
 
             # if the score is lower than the best score and quorum is met
             if score < best_deletion.score:
                 best_deletion = deletion(in_node, out_node, score)
+        search_time = time.time() - search_time
+        self._emit(
+            "find_cut",
+            elapsed=search_time,
+            n_candidates=n_candidates,
+            n_evaluated=n_evaluated,
+            edges_per_second=n_evaluated / search_time if search_time > 0 else np.inf,
+            score=best_deletion.score,
+        )
         if make:
             return self.make_cut(*best_deletion, MSF=MSF)
         return best_deletion
 
+    def _quorum_feasible(self, MSF, edges, quorum, n_subtrees, labels):
+        """
+        Flag the edges of the MSF whose deletion keeps every region at or above
+        ``quorum``, using a single pass over the subtree sizes of the forest.
+
+        Parameters
+        ----------
+
+        MSF : scipy.sparse.csgraph.minimum_spanning_tree
+            An :math:`(N,N)` scipy sparse matrix with zero elements removed.
+        edges : numpy.array
+            An :math:`(E,2)` array of ``(in_node, out_node)`` candidate edges.
+        quorum : int, float
+            The minimum number of elements in the region.
+        n_subtrees : int
+            The current number of subtrees in ``MSF``.
+        labels : numpy.array
+            An :math:`(N,)` vector of the current subtree labels of ``MSF``.
+
+        Returns
+        -------
+
+        numpy.array
+            An :math:`(E,)` boolean mask of feasible edges.
+
+        """
+        component_sizes = np.bincount(labels, minlength=n_subtrees)
+        if (component_sizes < quorum).any():
+            return np.zeros(len(edges), dtype=bool)
+        parents, sizes = _subtree_sizes(MSF, labels)
+        in_node, out_node = edges[:, 0], edges[:, 1]
+        # whichever endpoint is the child carries the subtree split off by the cut
+        child = np.where(parents[out_node] == in_node, out_node, in_node)
+        split = sizes[child]
+        remainder = component_sizes[labels[child]] - split
+        return (split >= quorum) & (remainder >= quorum)
+
     def make_cut(self, in_node, out_node, score, MSF=None):
         """
         Make a cut on the MSF inplace.
@@ -548,3 +947,137 @@ class Skater(BaseSpOptHeuristicSolver):
             islands=self.islands,
         )
         self.labels_ = model.current_labels_
+
+
+class SkaterBatch(BaseSpOptHeuristicSolver):
+    """Solve SKATER for a stack of attribute scenarios on one spatial graph.
+
+    The binary adjacency of ``w`` is built once and shared by every scenario.
+    With ``n_jobs`` other than ``1``, scenarios are solved in a process pool
+    that receives the adjacency once per worker, since the cut search is pure
+    Python and would not run in parallel in threads. ``spanning_forest_kwds``
+    must then be picklable.
+
+    Parameters
+    ----------
+
+    w : libpysal.weights.W
+        A PySAL weights object created from given data expressing the neighbor
+        relationships between observations. It must be symmetric and binary, for
+        example: Queen/Rook, DistanceBand, or a symmetrized KNN.
+    data : numpy.ndarray, list
+        An array of shape :math:`(S,N,P)`, or a list of :math:`S` arrays of shape
+        :math:`(N,P_s)`, holding the attributes for each of the :math:`S`
+        scenarios.
+    n_clusters : int (default 5)
+        The number of clusters to form.
+    floor : int, float (default -numpy.inf)
+        The floor on the size of regions.
+    islands : str (default 'increase')
+        Description of what to do with islands. If ``'ignore'``, the algorithm will
+        discover ``n_clusters`` regions, treating islands as their own regions. If
+        "increase", the algorithm will discover ``n_clusters`` regions,
+        treating islands as separate from ``n_clusters``.
+    spanning_forest_kwds : dict (default dict())
+        Keyword arguments to be passed to ``SpanningForest`` including
+        ``dissimilarity``, ``affinity``, ``reduction``, and ``center``.
+        See ``spopt.region.skater.SpanningForest`` for docstrings.
+    n_jobs : int (default 1)
+        The number of processes solving scenarios. ``-1`` uses all processors.
+
+    Attributes
+    ----------
+
+    labels_ : numpy.array
+        An :math:`(S,N)` array of region IDs for observations in each scenario.
+
+    Examples
+    --------
+
+    >>> from spopt.region import SkaterBatch
+    >>> import geopandas
+    >>> import libpysal
+    >>> import numpy
+
+    >>> pth = libpysal.examples.get_path('mexicojoin.shp')
+    >>> mexico = geopandas.read_file(pth)
+    >>> w = libpysal.weights.Queen.from_dataframe(mexico)
+
+    Solve for each decade of per capita GDP separately.
+
+    >>> data = [mexico[[f'PCGDP{year}']].values for year in range(1940, 2010, 10)]
+    >>> model = SkaterBatch(w, data, n_clusters=5, n_jobs=-1)
+    >>> model.solve()
+    >>> model.labels_.shape
+    (7, 32)
+
+    """
+
+    def __init__(
+        self,
+        w,
+        data,
+        n_clusters=5,
+        floor=-np.inf,
+        islands="increase",
+        spanning_forest_kwds=dict(),
+        n_jobs=1,
+    ):
+        self.w = w
+        self.data = data
+        self.n_clusters = n_clusters
+        self.floor = floor
+        self.islands = islands
+        self.spanning_forest_kwds = spanning_forest_kwds
+        self.n_jobs = n_jobs
+
+    def solve(self):
+        adjacency = _binary_sparse(self.w).copy()
+        n = adjacency.shape[0]
+
+        for scenario, X in enumerate(self.data):
+            if X.shape[0] != n:
+                raise ValueError(
+                    f"Scenario {scenario} has {X.shape[0]} observations, "
+                    f"but the weights object has {n}."
+                )
+
+        args = (
+            adjacency,
+            self.n_clusters,
+            self.floor,
+            self.islands,
+            self.spanning_forest_kwds,
+        )
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        if n_jobs == 1:
+            labels = [_solve_scenario(args, X) for X in self.data]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=n_jobs,
+                initializer=_init_batch_worker,
+                initargs=(args,),
+            ) as pool:
+                labels = list(pool.map(_batch_worker, self.data))
+        self.labels_ = np.vstack(labels) if labels else np.empty((0, n), dtype=int)
+
+
+_batch_worker_args = {}
+
+
+def _init_batch_worker(args):
+    """Process pool initializer storing the graph and settings of a batch."""
+    _batch_worker_args["args"] = args
+
+
+def _batch_worker(X):
+    """Solve one ``SkaterBatch`` scenario on the stored graph."""
+    return _solve_scenario(_batch_worker_args["args"], X)
+
+
+def _solve_scenario(args, X):
+    """Solve one ``SkaterBatch`` scenario for the attributes ``X``."""
+    adjacency, n_clusters, floor, islands, kwds = args
+    model = SpanningForest(**kwds)
+    model.fit(n_clusters, adjacency, data=X, quorum=floor, islands=islands)
+    return model.current_labels_
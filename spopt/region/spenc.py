@@ -50,7 +50,7 @@ class Spenc(BaseSpOptHeuristicSolver):
         degree=3,
         coef0=1,
         kernel_params=None,
-        n_jobs=1,
+        n_jobs=None,
     ):
         """
 
@@ -78,10 +78,12 @@ class Spenc(BaseSpOptHeuristicSolver):
             Ignored for ``affinity='nearest_neighbors'``.
         eigen_solver : str (default None)
             The eigenvalue decomposition strategy to use. Valid values include
-            ``{'arpack', 'lobpcg', 'amg'}``. AMG requires ``pyamg`` to be installed,
-            which may be faster on very large, sparse problems, but may also lead to
-            instabilities. *Note* – ``eigen_solver`` is ignored unless fitting using
-            the ``breakme`` flag in the ``.fit()`` method (so do not use then).
+            ``{'arpack', 'lobpcg', 'amg'}``. ``None`` and ``'arpack'`` use
+            ``scipy.sparse.linalg.eigsh``, ``'lobpcg'`` uses LOBPCG with a Jacobi
+            preconditioner, and ``'amg'`` uses LOBPCG with an algebraic multigrid
+            preconditioner. AMG requires ``pyamg`` to be installed, which may be
+            faster on very large, sparse problems, but may also lead to
+            instabilities.
         n_init : int (default 10)
             The number of times the :math:`k`-means algorithm will be run with
             different centroid seeds. The final results will be the best output of
@@ -101,10 +103,11 @@ class Spenc(BaseSpOptHeuristicSolver):
             when using ``'arpack'`` as the ``eigen_solver``.
         assign_labels : str (default 'discretize')
             The strategy to use to assign labels in the embedding
-            space. There are three ways to assign labels after the laplacian
-            embedding: ``{'kmeans', 'discretize', 'hierarchical'}``:
+            space. There are four ways to assign labels after the laplacian
+            embedding: ``{'kmeans', 'minibatch_kmeans', 'discretize', 'hierarchical'}``:
 
             * ``'kmeans'`` can be applied and is a popular choice. But it can also be sensitive to initialization.
+            * ``'minibatch_kmeans'`` fits :math:`k`-means to random batches of the embedding, which is much faster for very large problems at a small cost in inertia.
             * ``'discretize'`` is another approach which is less sensitive to random initialization, and which usually finds better clusters.
             * ``'hierarchical'`` decomposition repeatedly bi-partitions the graph, instead of finding the decomposition all at once, as suggested in :cite:`shi_malik_2000`.
 
@@ -116,10 +119,14 @@ class Spenc(BaseSpOptHeuristicSolver):
         kernel_params : dict (default None)
             Parameters (keyword arguments) and values for affinity kernel passed as
             callable object. Ignored by other affinity kernels.
-        n_jobs : int (default 1)
+        n_jobs : int (default None)
             The number of parallel jobs to run for the nearest-neighbors
-            affinity kernel, if used. If ``-1``, then the number of jobs
-            is set to the number of CPU cores.
+            affinity kernel, if used, and the number of threads splitting
+            independent subgraphs when ``assign_labels='hierarchical'``,
+            or the :math:`k`-means threads otherwise. If ``-1``, then the number
+            of jobs is set to the number of CPU cores. If ``None``, the
+            :math:`k`-means and nearest-neighbors jobs keep their own defaults,
+            and subgraphs are split on a single thread.
 
         Attributes
         ----------
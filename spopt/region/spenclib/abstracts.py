@@ -1,21 +1,112 @@
 # ruff: noqa: C408, B006, E731, N803, N806
 
+import hashlib
+import itertools
+import os
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
 import numpy as np
 import scipy.sparse as spar
 import sklearn.metrics as skm
-import sklearn.metrics.pairwise as pw
 from scipy.sparse import csgraph as cg
 from scipy.sparse import linalg as la
 from sklearn import cluster as clust
+from sklearn.base import clone
 from sklearn.cluster._spectral import discretize as _discretize
-from sklearn.neighbors import kneighbors_graph
 from sklearn.preprocessing import LabelEncoder
 from sklearn.utils import check_random_state
 from sklearn.utils.extmath import _deterministic_vector_sign_flip
 from sklearn.utils.validation import check_array
+from threadpoolctl import threadpool_limits
 
 from .scores import boundary_fraction
-from .utils import check_weights
+from .utils import check_weights, contiguous_labels, edge_kernels, knn_affinity
+
+
+def _sweep_objective(second_eigenvector, affinity_matrix):
+    """
+    Evaluate the normalized cut objective of Shi and Malik (2000) for every
+    threshold on the second eigenvector in a single sweep over its sorted order.
+
+    Parameters
+    ----------
+
+    second_eigenvector : np.ndarray of shape (n,)
+                         the vector whose sorted values define the sweep.
+    affinity_matrix    : sparse or dense array of shape (n, n)
+                         affinities between the n observations.
+
+    Returns
+    -------
+
+    sorted_eigenvector : np.ndarray of shape (n,)
+                         ``second_eigenvector`` in ascending order.
+    surface            : np.ndarray of shape (n + 1,)
+                         objective for the cut placing the first m sorted
+                         observations on one side, for m = 0, ..., n. Undefined
+                         cuts, such as those with an empty side, are ``inf``.
+    """
+    n = second_eigenvector.shape[0]
+    order = np.argsort(second_eigenvector, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(n)
+    row_sums = np.asarray(affinity_matrix.sum(axis=1)).ravel()[order]
+    assoc_a = np.concatenate(([0], np.cumsum(row_sums)))
+    assoc_b = np.concatenate((np.cumsum(row_sums[::-1])[::-1], [0]))
+
+    # an entry (i, j) crosses the cut for every prefix holding i but not j
+    edges = spar.coo_matrix(affinity_matrix)
+    from_rank, to_rank = rank[edges.row], rank[edges.col]
+    crossing = from_rank < to_rank
+    weights = edges.data[crossing]
+    change = np.bincount(
+        from_rank[crossing] + 1, weights=weights, minlength=n + 1
+    ) - np.bincount(to_rank[crossing] + 1, weights=weights, minlength=n + 1)
+    cut_ab = np.cumsum(change) * 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        surface = cut_ab / assoc_a + cut_ab / assoc_b
+    surface[np.isnan(surface)] = np.inf
+    surface[[0, -1]] = np.inf
+    return second_eigenvector[order], surface
+
+
+def _fingerprint(affinity_matrix):
+    """
+    Hash the shape, sparsity pattern and values of an affinity matrix.
+
+    Parameters
+    ----------
+
+    affinity_matrix : sparse or dense array of shape (n, n)
+                      the matrix to fingerprint.
+
+    Returns
+    -------
+
+    a hex digest that is equal for equal matrices, however they are stored.
+    """
+    digest = hashlib.sha1(str(affinity_matrix.shape).encode())
+    if spar.issparse(affinity_matrix):
+        affinity_matrix = spar.csr_matrix(affinity_matrix)
+        if not affinity_matrix.has_canonical_format:
+            affinity_matrix = affinity_matrix.copy()
+            affinity_matrix.sum_duplicates()
+        for part in (
+            affinity_matrix.indptr,
+            affinity_matrix.indices,
+            affinity_matrix.data,
+        ):
+            digest.update(np.ascontiguousarray(part, dtype=np.float64).tobytes())
+    else:
+        digest.update(np.ascontiguousarray(affinity_matrix, dtype=np.float64).tobytes())
+    return digest.hexdigest()
 
 
 class SPENC(clust.SpectralClustering):
@@ -33,7 +124,7 @@ class SPENC(clust.SpectralClustering):
         degree=3,
         coef0=1,
         kernel_params=None,
-        n_jobs=1,
+        n_jobs=None,
     ):
         """
         Apply clustering to a projection of the normalized laplacian, using
@@ -71,10 +162,12 @@ class SPENC(clust.SpectralClustering):
             The number of clusters to form.
         eigen_solver : str (default None)
             The eigenvalue decomposition strategy to use. Valid values include
-            ``{'arpack', 'lobpcg', 'amg'}``. AMG requires ``pyamg`` to be installed,
-            which may be faster on very large, sparse problems, but may also lead to
-            instabilities. *Note* – ``eigen_solver`` is ignored unless fitting using
-            the ``breakme`` flag in the ``.fit()`` method (so do not use then).
+            ``{'arpack', 'lobpcg', 'amg'}``. ``None`` and ``'arpack'`` use
+            ``scipy.sparse.linalg.eigsh``, optionally in shift-invert mode.
+            ``'lobpcg'`` uses LOBPCG with a Jacobi (inverse diagonal) preconditioner,
+            and ``'amg'`` uses LOBPCG with an algebraic multigrid preconditioner.
+            AMG requires ``pyamg`` to be installed, which may be faster on very
+            large, sparse problems, but may also lead to instabilities.
         random_state : int or numpy.random.RandomState (default None)
             A pseudo random number generator used for the initialization of the lobpcg
             eigen vectors decomposition when ``eigen_solver='amg'`` and by the
@@ -100,16 +193,22 @@ class SPENC(clust.SpectralClustering):
         n_neighbors : int (default 10)
             The number of neighbors to use when constructing the affinity matrix using
             the nearest neighbors method. Ignored for ``affinity='rbf'``.
+            Like the kernels, the nearest neighbors affinity is only kept on the
+            edges of the spatial weights matrix.
         eigen_tol : float (default 1e-7)
             Stopping criterion for eigen decomposition of the Laplacian matrix
             when using ``'arpack'`` as the ``eigen_solver``.
         assign_labels : str (default 'discretize')
             The strategy to use to assign labels in the embedding
-            space. There are three ways to assign labels after the laplacian
-            embedding: ``{'kmeans', 'discretize', 'hierarchical'}``:
+            space. There are four ways to assign labels after the laplacian
+            embedding: ``{'kmeans', 'minibatch_kmeans', 'discretize',
+            'hierarchical'}``:
 
             * ``'kmeans'`` can be applied and is a popular choice. But it can also
             be sensitive to initialization.
+            * ``'minibatch_kmeans'`` fits :math:`k`-means to random batches of
+            the embedding, which is much faster for very large problems at a
+            small cost in inertia.
             * ``'discretize'`` is another approach which is less sensitive to random
              initialization, and which usually finds better clusters.
             * ``'hierarchical'`` decomposition repeatedly bi-partitions the graph,
@@ -124,10 +223,14 @@ class SPENC(clust.SpectralClustering):
         kernel_params : dict (default None)
             Parameters (keyword arguments) and values for affinity kernel passed as
             callable object. Ignored by other affinity kernels.
-        n_jobs : int (default 1)
+        n_jobs : int (default None)
             The number of parallel jobs to run for the nearest-neighbors
-            affinity kernel, if used. If ``-1``, then the number of jobs
-            is set to the number of CPU cores.
+            affinity kernel, if used, and the number of threads splitting
+            independent subgraphs when ``assign_labels='hierarchical'``,
+            or the :math:`k`-means threads otherwise. If ``-1``, then the number
+            of jobs is set to the number of CPU cores. If ``None``, the
+            :math:`k`-means and nearest-neighbors jobs keep their own defaults,
+            and subgraphs are split on a single thread.
 
         Attributes
         ----------
@@ -135,6 +238,10 @@ class SPENC(clust.SpectralClustering):
         affinity_matrix_ : array-like
             Affinity matrix used for clustering in the shape of
             ``(n_samples, n_samples)``. Available only if after calling ``fit``.
+        attribute_affinity_ : scipy.sparse.csr_matrix
+            Kernel values of the attributes, evaluated only for the pairs of
+            observations that are neighbors in ``W``. Available only after calling
+            ``fit`` with a kernel ``affinity``.
         labels_ : list
             Cluster labels of each point or area.
 
@@ -196,6 +303,10 @@ class SPENC(clust.SpectralClustering):
         grid_resolution=100,
         floor=0,
         floor_weights=None,
+        cut_method="gridsearch",
+        warm_start=False,
+        cache=None,
+        contiguous=False,
     ):
         """Creates an affinity matrix for X using the selected affinity,
         applies W to the affinity elementwise, and then applies spectral clustering
@@ -232,6 +343,27 @@ class SPENC(clust.SpectralClustering):
         floor_weights   : np.ndarray of shape (n,), default np.ones((n,))
                           array containing weights for each observation used to
                           determine the region floor.
+        cut_method      : str, default "gridsearch"
+                          method used to cut the second eigenvector of each
+                          subgraph when ``assign_labels="hierarchical"``. See
+                          ``SPENC._spectral_bipartition`` for the options.
+        warm_start      : bool, default False
+                          whether to start the eigensolver for each subgraph
+                          from the restriction of its parent's second eigenvector
+                          when ``assign_labels="hierarchical"``.
+        cache           : dict, default None
+                          dictionary storing the normalized laplacian and the
+                          eigenpairs found for each affinity matrix, keyed by its
+                          fingerprint. Passing the same dictionary to several
+                          fits, such as a search over ``n_clusters``, reuses them
+                          for any affinity matrix (or hierarchical subgraph) seen
+                          before. A fit needing no more eigenpairs than are cached
+                          skips the eigensolver entirely.
+        contiguous      : bool, default False
+                          whether to make the clusters found by ``'kmeans'`` or
+                          ``'minibatch_kmeans'`` connected in W, by dissolving
+                          all but the largest piece of each cluster into the
+                          clusters around it. See ``utils.contiguous_labels``.
 
         Notes
         -----
@@ -249,8 +381,10 @@ class SPENC(clust.SpectralClustering):
 
         """  # noqa: E501
 
+        # an unbounded number of clusters can only be found hierarchically
+        assign_labels = self.assign_labels
         if np.isinf(self.n_clusters):
-            self.assign_labels = "hierarchical"
+            assign_labels = "hierarchical"
 
         if X is not None:
             X = check_array(
@@ -263,28 +397,27 @@ class SPENC(clust.SpectralClustering):
                 W = check_weights(W, X)
 
             if self.affinity == "nearest_neighbors":
-                connectivity = kneighbors_graph(
-                    X,
-                    n_neighbors=self.n_neighbors,
-                    include_self=True,
-                    n_jobs=self.n_jobs,
+                self.affinity_matrix_ = knn_affinity(
+                    W, X, n_neighbors=self.n_neighbors, n_jobs=self.n_jobs
                 )
-                self.affinity_matrix_ = 0.5 * (connectivity + connectivity.T)
             elif self.affinity == "precomputed":
                 self.affinity_matrix_ = X
             else:
-                params = self.kernel_params
-                if params is None:
-                    params = {}
-                if not callable(self.affinity):
-                    params["gamma"] = self.gamma
-                    params["degree"] = self.degree
-                    params["coef0"] = self.coef0
-                self.attribute_affinity_ = pw.pairwise_kernels(
-                    X, metric=self.affinity, filter_params=True, **params
+                params = self._kernel_params()
+                # only the kernel values on the edges of W survive the product
+                # with W, so never build the dense N x N attribute affinity
+                W = spar.csr_matrix(W)
+                edges = W.tocoo()
+                kernel = edge_kernels(
+                    X, edges.row, edges.col, metric=self.affinity, **params
+                )
+                self.attribute_affinity_ = spar.csr_matrix(
+                    (kernel, (edges.row, edges.col)), shape=W.shape
                 )
                 self.spatial_affinity_ = W
-                self.affinity_matrix_ = W.multiply(self.attribute_affinity_)
+                self.affinity_matrix_ = spar.csr_matrix(
+                    (edges.data * kernel, (edges.row, edges.col)), shape=W.shape
+                )
         else:
             self.affinity_matrix_ = W
         if breakme:  ##sklearn/issues/8129
@@ -296,28 +429,63 @@ class SPENC(clust.SpectralClustering):
             del self.affinity_
             return self
 
-        if self.assign_labels == "hierarchical":
+        if assign_labels == "hierarchical":
             self.labels_ = self._spectral_bipartition(
                 grid_resolution=grid_resolution,
                 shift_invert=shift_invert,
                 floor=floor,
                 floor_weights=floor_weights,
+                cut_method=cut_method,
+                warm_start=warm_start,
+                cache=cache,
             )
             return self
 
-        embedding = self._embed(self.affinity_matrix_, shift_invert=shift_invert)
+        embedding = self._embed(
+            self.affinity_matrix_, shift_invert=shift_invert, cache=cache
+        )
         self.embedding_ = embedding.T
         random_state = check_random_state(self.random_state)
 
-        if self.assign_labels == "kmeans":
-            self.labels_ = (
-                clust.KMeans(n_clusters=self.n_clusters).fit(self.embedding_).labels_
+        if assign_labels in ("kmeans", "minibatch_kmeans"):
+            estimator = {
+                "kmeans": clust.KMeans,
+                "minibatch_kmeans": clust.MiniBatchKMeans,
+            }[assign_labels]
+            kmeans = estimator(
+                n_clusters=self.n_clusters,
+                n_init=self.n_init,
+                random_state=random_state,
             )
+            # only cap the k-means threads when asked to
+            n_jobs = None if self.n_jobs in (None, -1) else self.n_jobs
+            with threadpool_limits(limits=n_jobs, user_api="openmp"):
+                self.labels_ = kmeans.fit(self.embedding_).labels_
+            if contiguous:
+                self.labels_ = contiguous_labels(
+                    self.affinity_matrix_ if W is None else W, self.labels_
+                )
         else:
             self.labels_ = _discretize(self.embedding_, random_state=random_state)
         return self
 
-    def _embed(self, affinity, shift_invert=True):
+    def _kernel_params(self):
+        """Keyword arguments for the attribute kernel named by ``affinity``."""
+        params = dict(self.kernel_params or {})
+        if not callable(self.affinity):
+            params["gamma"] = self.gamma
+            params["degree"] = self.degree
+            params["coef0"] = self.coef0
+        return params
+
+    def _embed(
+        self,
+        affinity,
+        shift_invert=True,
+        warm_start=None,
+        cache=None,
+        n_components=None,
+    ):
         """
         Compute the eigenspace embedding of a given affinity matrix.
 
@@ -329,31 +497,137 @@ class SPENC(clust.SpectralClustering):
         shift_invert:   bool
                         whether or not to use the shift-invert eigenvector search
                         trick useful for finding sparse eigenvectors.
+                        Only used by the default ``'arpack'`` eigen_solver.
+        warm_start  :   np.ndarray of shape (n,), default None
+                        approximation of the second row of the embedding, such
+                        as the restriction of a parent subgraph's second row,
+                        used to start the eigensolver instead of a random vector.
+        cache       :   dict, default None
+                        dictionary mapping the fingerprint of each affinity
+                        matrix to its negated normalized laplacian, degrees, and
+                        the eigenpairs found so far. Cached eigenpairs are reused
+                        when there are at least ``n_clusters`` of them; otherwise
+                        the cached laplacian is solved again for more, starting
+                        ``'lobpcg'`` and ``'amg'`` from the cached eigenvectors.
+        n_components:   int, default None
+                        number of eigenvectors to embed with, or ``n_clusters``
+                        if None.
         """
-        laplacian, orig_d = cg.laplacian(affinity, normed=True, return_diag=True)
-        laplacian *= -1
+        k = self.n_clusters if n_components is None else n_components
+        key = entry = None
+        if cache is not None:
+            key = _fingerprint(affinity)
+            entry = cache.get(key)
+        if entry is None:
+            laplacian, orig_d = cg.laplacian(affinity, normed=True, return_diag=True)
+            laplacian *= -1
+        else:
+            laplacian, orig_d = entry["laplacian"], entry["diagonal"]
+            if entry["vectors"].shape[1] >= k:
+                return self._embedding(entry["vectors"][:, -k:], orig_d)
         random_state = check_random_state(self.random_state)
-        v0 = random_state.uniform(-1, 1, laplacian.shape[0])
-
-        if not shift_invert:
+        n_samples = laplacian.shape[0]
+        v0 = random_state.uniform(-1, 1, n_samples)
+        lobpcg = self.eigen_solver in ("lobpcg", "amg")
+        fiedler = None
+        if warm_start is not None:
+            # start from the trivial eigenvector plus the guess at the second one,
+            # mapped back from the embedding onto the normalized laplacian
+            trivial = orig_d / np.linalg.norm(orig_d)
+            fiedler = warm_start * orig_d
+            fiedler -= trivial * (trivial @ fiedler)
+            fiedler_norm = np.linalg.norm(fiedler)
+            if fiedler_norm > 0:
+                v0 = trivial + fiedler / fiedler_norm
+            else:
+                fiedler = None
+
+        if n_samples <= k or (lobpcg and n_samples < 5 * k + 1):
+            # too small for a sparse eigensolver, so solve it densely, keeping
+            # every eigenpair for the cache
+            dense = laplacian.toarray() if spar.issparse(laplacian) else laplacian
+            ev, spectrum = np.linalg.eigh(dense)
+        elif lobpcg:
+            X = random_state.standard_normal((n_samples, k))
+            X[:, 0] = orig_d
+            if fiedler is not None:
+                X[:, 1] = fiedler
+            if entry is not None:
+                # the cached eigenvectors span most of the wanted subspace
+                n_cached = entry["vectors"].shape[1]
+                X[:, :n_cached] = entry["vectors"]
+            ev, spectrum = self._lobpcg(-laplacian, X)
+        elif not shift_invert:
             ev, spectrum = la.eigsh(
-                laplacian, which="LA", k=self.n_clusters, v0=v0, tol=self.eigen_tol
+                laplacian, which="LA", k=k, v0=v0, tol=self.eigen_tol
             )
         else:
             ev, spectrum = la.eigsh(
                 laplacian,
                 which="LM",
                 sigma=1,
-                k=self.n_clusters,
+                k=k,
                 v0=v0,
                 tol=self.eigen_tol,
             )
 
-        embedding = spectrum.T[self.n_clusters :: -1]  # sklearn/issues/8129
+        if cache is not None:
+            cache[key] = dict(
+                laplacian=laplacian, diagonal=orig_d, values=ev, vectors=spectrum
+            )
+        return self._embedding(spectrum[:, -k:], orig_d)
+
+    def _embedding(self, spectrum, orig_d):
+        """
+        Map the top eigenvectors of the normalized laplacian, in ascending order
+        of their eigenvalues, to the rows of the spectral embedding.
+        """
+        embedding = spectrum.T[spectrum.shape[1] :: -1]  # sklearn/issues/8129
         embedding = embedding / orig_d
         embedding = _deterministic_vector_sign_flip(embedding)
         return embedding
 
+    def _lobpcg(self, laplacian, X):
+        """
+        Find the smallest eigenpairs of a normalized laplacian with LOBPCG,
+        preconditioned by its inverse diagonal (``eigen_solver='lobpcg'``)
+        or by an algebraic multigrid solver (``eigen_solver='amg'``).
+
+        Parameters
+        ----------
+
+        laplacian   :   sparse or dense matrix
+                        the (positive semi-definite) normalized laplacian.
+        X           :   np.ndarray of shape (n, n_clusters)
+                        initial approximation of the eigenvectors.
+
+        Returns
+        -------
+
+        eigenvalues and eigenvectors of the negated laplacian, in the ascending
+        order returned by ``scipy.sparse.linalg.eigsh``.
+        """
+        n_samples = laplacian.shape[0]
+        if self.eigen_solver == "amg":
+            try:
+                from pyamg import smoothed_aggregation_solver
+            except ImportError:
+                raise ValueError(
+                    "The eigen_solver was set to 'amg', but pyamg is not available."
+                ) from None
+            # shift off the null space so the multigrid hierarchy is well posed
+            shifted = spar.csr_matrix(laplacian) + 1e-5 * spar.identity(n_samples)
+            M = smoothed_aggregation_solver(shifted).aspreconditioner()
+        else:
+            diagonal = np.asarray(laplacian.diagonal(), dtype=float)
+            diagonal[diagonal == 0] = 1
+            M = spar.diags(1 / diagonal)
+        ev, spectrum = la.lobpcg(
+            laplacian, X, M=M, tol=self.eigen_tol, largest=False, maxiter=2000
+        )
+        order = np.argsort(-ev)
+        return -ev[order], spectrum[:, order]
+
     def _spectral_bipartition(
         self,
         grid_resolution=100,
@@ -361,6 +635,8 @@ class SPENC(clust.SpectralClustering):
         floor=0,
         floor_weights=None,
         cut_method="gridsearch",
+        warm_start=False,
+        cache=None,
     ):
         """
         Implements the recursive spectral bipartitioning of shi and malik (2000)
@@ -398,59 +674,131 @@ class SPENC(clust.SpectralClustering):
                           3. "median": cut the eigenvector through its median.
                             This means the regions will always be divided into two
                             halves with equal numbers of elemental units.
-                          "gridsearch" may be slow when grid_resolution is large.
-                          "zero" is the best method for large data.
+                          4. "sweep": the exact minimum of the normalized cut
+                            over every threshold between distinct values of the
+                            second eigenvector, ignoring grid_resolution.
+                          "gridsearch" and "sweep" evaluate all of their cutpoints
+                          in one pass over the sorted eigenvector, costing
+                          O(|E| + n log n) per subgraph.
+        warm_start      : bool
+                          whether to start the eigensolver for each subgraph from
+                          the restriction of its parent's second eigenvector,
+                          rather than from a random vector. (Default: False)
+        cache           : dict
+                          dictionary of laplacians and eigenpairs of previously
+                          seen subgraphs, passed to ``SPENC._embed``.
+                          (Default: None)
+
+        Notes
+        -----
+
+        Subgraphs waiting to be split are independent of one another, so each
+        wave of them is split concurrently on ``n_jobs`` threads. Their cuts are
+        accepted in queue order, so the labels are the same for any ``n_jobs``
+        provided ``random_state`` is ``None`` or an integer.
         """
 
+        n_samples = self.affinity_matrix_.shape[0]
         if floor_weights is None:
-            floor_weights = np.ones((self.affinity_matrix_.shape[0],))
+            floor_weights = np.ones((n_samples,))
         if spar.issparse(self.affinity_matrix_):
             self.affinity_matrix_ = self.affinity_matrix_.tocsr()
         threshold = self.n_clusters
-        self.n_clusters = 2
         discovered = 1
-        this_cut = np.ones((self.affinity_matrix_.shape[0],)).astype(bool)
-        cuts = []
-        accepted_cuts = []
-        while discovered < threshold:
-            current_affinity = self.affinity_matrix_[this_cut, :][:, this_cut]
-            embedding = self._embed(current_affinity, shift_invert=shift_invert)
+        # each subproblem is the contiguous block order[start:stop]; splitting a
+        # block moves its left nodes ahead of its right nodes, keeping their
+        # relative order, so both children are again contiguous blocks and their
+        # affinities are the diagonal blocks of the permuted parent affinity.
+        order = np.arange(n_samples)
+        leaf = np.full(n_samples, -1)
+        n_accepted = 0
+        cuts = deque([(0, n_samples, self.affinity_matrix_, None)])
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else (self.n_jobs or 1)
+        pool = ThreadPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+
+        def split(block):
+            """Find the second eigenvector of a block and its cut."""
+            start, stop, current_affinity, parent_vector = block
+            if stop - start < 2:
+                return None
+            embedding = self._embed(
+                current_affinity,
+                shift_invert=shift_invert,
+                warm_start=parent_vector if warm_start else None,
+                cache=cache,
+                n_components=2,
+            )
             second_eigenvector = embedding[1]
-            new_cut, score_of_cut = self._make_hierarchical_cut(
+            new_cut, _ = self._make_hierarchical_cut(
                 second_eigenvector,
                 current_affinity,
                 grid_resolution,
                 cut_method=cut_method,
-                floor=floor,
             )
-            left_cut = this_cut.copy()
-            left_cut[left_cut] *= new_cut
-            right_cut = this_cut.copy()
-            right_cut[right_cut] *= ~new_cut
-            assert (
-                len(this_cut) == len(left_cut) == len(right_cut)
-            ), "Indexing Error in cutting!"
-            if ((left_cut * floor_weights).sum() > floor) & (
-                (right_cut * floor_weights).sum() > floor
-            ) and (tuple(left_cut) not in accepted_cuts) & (
-                tuple(right_cut) not in accepted_cuts
-            ):
-                cuts.append(left_cut)
-                accepted_cuts.append(tuple(left_cut))
-                cuts.append(right_cut)
-                accepted_cuts.append(tuple(right_cut))
-            discovered += 1
-            try:
-                this_cut = cuts.pop(0)
-            except IndexError:
-                break
-        accepted_cuts = np.vstack(accepted_cuts)
-        labels = np.ones((accepted_cuts[0].shape[0],)) * -1.0
-        for i, k in enumerate(np.flipud(accepted_cuts)):
-            unassigned = labels == -1
-            should_assign = unassigned & k
-            labels[should_assign] = i
-        return LabelEncoder().fit_transform(labels)
+            return second_eigenvector, new_cut
+
+        try:
+            while discovered < threshold and cuts:
+                # every queued block is independent of the others, and any
+                # children they produce queue up behind them, so the next wave
+                # is exactly the blocks a serial pass would visit next. They are
+                # split concurrently but accepted in queue order, so labels do
+                # not depend on n_jobs.
+                wave = [
+                    cuts.popleft()
+                    for _ in range(int(min(len(cuts), threshold - discovered)))
+                ]
+                discovered += len(wave)
+                splits = (map if pool is None else pool.map)(split, wave)
+                for block, result in zip(wave, splits, strict=True):
+                    if result is None:
+                        continue
+                    start, stop, current_affinity, _ = block
+                    second_eigenvector, new_cut = result
+                    nodes = order[start:stop]
+                    n_left = new_cut.sum()
+                    if not (
+                        (0 < n_left < len(nodes))
+                        and (floor_weights[nodes[new_cut]].sum() > floor)
+                        and (floor_weights[nodes[~new_cut]].sum() > floor)
+                    ):
+                        continue
+                    permutation = np.concatenate(
+                        (np.flatnonzero(new_cut), np.flatnonzero(~new_cut))
+                    )
+                    order[start:stop] = nodes[permutation]
+                    if spar.issparse(current_affinity):
+                        current_affinity = current_affinity[permutation][:, permutation]
+                    else:
+                        current_affinity = current_affinity[
+                            np.ix_(permutation, permutation)
+                        ]
+                    middle = start + n_left
+                    leaf[order[start:middle]] = n_accepted
+                    leaf[order[middle:stop]] = n_accepted + 1
+                    n_accepted += 2
+                    second_eigenvector = second_eigenvector[permutation]
+                    cuts.append(
+                        (
+                            start,
+                            middle,
+                            current_affinity[:n_left, :n_left],
+                            second_eigenvector[:n_left],
+                        )
+                    )
+                    cuts.append(
+                        (
+                            middle,
+                            stop,
+                            current_affinity[n_left:, n_left:],
+                            second_eigenvector[n_left:],
+                        )
+                    )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        # later (finer) cuts take the lower labels
+        return LabelEncoder().fit_transform(-leaf)
 
     def _make_hierarchical_cut(
         self,
@@ -480,15 +828,30 @@ class SPENC(clust.SpectralClustering):
 
         objective = mkobjective(second_eigenvector)
 
+        if cut_method in ("gridsearch", "sweep"):
+            sorted_eigenvector, sweep_surface = _sweep_objective(
+                second_eigenvector, affinity_matrix
+            )
         if cut_method == "gridsearch":
             support = np.linspace(
                 *np.percentile(second_eigenvector, q=(2, 98)), num=grid_resolution
             )
-
-            objective_surface = [objective(cutpoint) for cutpoint in support]
+            # the number of nodes at or below each cutpoint indexes its objective
+            n_below = np.searchsorted(sorted_eigenvector, support, side="right")
+            objective_surface = sweep_surface[n_below]
             cutpoint = support[np.argmin(objective_surface)]
             cut = second_eigenvector <= cutpoint
             return cut, np.min(objective_surface)
+        elif cut_method == "sweep":
+            # only thresholds between distinct values separate the sorted prefix
+            distinct = np.ones_like(sweep_surface, dtype=bool)
+            distinct[1:-1] = sorted_eigenvector[:-1] < sorted_eigenvector[1:]
+            sweep_surface = np.where(distinct, sweep_surface, np.inf)
+            n_below = np.argmin(sweep_surface)
+            cut = second_eigenvector <= sorted_eigenvector[max(n_below - 1, 0)]
+            if n_below == 0:
+                cut[:] = True
+            return cut, sweep_surface[n_below]
         elif cut_method == "median":
             median = np.median(second_eigenvector)
             score = objective(median)
@@ -519,8 +882,9 @@ class SPENC(clust.SpectralClustering):
                           array of data classified into `labels` to score.
         W               : sparse array or numpy array (N,N)
                           array representation of spatial relationships
-        labels          : numpy array (N,)
-                          vector of labels aligned with X and W
+        labels          : numpy array (N,) or (S,N)
+                          vector of labels aligned with X and W, or a stack
+                          of S such vectors to score at once.
         delta           : float
                           weight to apply to the attribute score.
                           Spatial score is given weight 1 - delta,
@@ -533,15 +897,28 @@ class SPENC(clust.SpectralClustering):
                                    (within/between deviation ratio)
         spatial_score   : callable
                           function to use to evaluate spatial regularity/contiguity.
-                          Must have signature spatial_score(X,labels,**params)
-                          Default: boundary_ratio(W,X,labels,**spatial_kw)
+                          Must have signature spatial_score(W,labels,X=X,**params)
+                          and accept stacks of labels if ``labels`` is a stack.
+                          Default: boundary_fraction(W,labels,X=X,**spatial_kw)
+
+        Returns
+        -------
+
+        the score, as a float for a single labeling or
+        as a numpy array (S,) for a stack of labelings.
         """
         if labels is None:
             if not hasattr(self, "labels_"):
                 raise Exception("Object must be fit in order to avoid passing labels.")
             labels = self.labels_
-        labels = np.asarray(labels).flatten()
-        attribute_score = attribute_score(X, labels, **attribute_kw)
+        labels = np.asarray(labels)
+        if labels.ndim > 1:
+            attribute_score = np.array(
+                [attribute_score(X, row, **attribute_kw) for row in labels]
+            )
+        else:
+            labels = labels.flatten()
+            attribute_score = attribute_score(X, labels, **attribute_kw)
         spatial_score = spatial_score(W, labels, X=X, **spatial_kw)
         return delta * attribute_score + (1 - delta) * spatial_score
 
@@ -625,6 +1002,155 @@ class SPENC(clust.SpectralClustering):
             result = result.flatten()
         return result
 
+    def sample_batch(
+        self,
+        W,
+        n_samples=1,
+        distribution=None,
+        seed=None,
+        n_jobs=1,
+        out=None,
+        chunk_size=256,
+        **fit_kw,
+    ):
+        """
+        Compute many random clusterings at once, as in ``sample``, but building
+        the sparsity structure of W only once, drawing every sample from its own
+        independent random generator, and spreading samples over processes.
+
+        Parameters
+        ----------
+
+        W             : np.ndarray or scipy.sparse matrix
+                        matrix encoding the spatial relationships between
+                        observations in the frame. Must be strictly binary &
+                        connected to result in connected graphs correct behavior.
+                        Mathematical properties of randomregions are undefined if not.
+        n_samples     : int, default 1
+                        integer describing how many samples to construct
+        distribution  : callable default is rng.normal(0, 1, size=(N,1))
+                        function that, when called with a numpy.random.Generator,
+                        draws the random weights used to generate the random
+                        regions. Must align with W, and be picklable if n_jobs > 1.
+        seed          : int or numpy.random.SeedSequence, default None
+                        entropy from which one independent generator is spawned
+                        per sample, so sample k is the same for any n_jobs.
+                        If the model has no random_state, the eigensolver of
+                        each sample is also seeded from its generator.
+        n_jobs        : int, default 1
+                        number of processes to spread the samples over.
+                        If -1, then the number of processes is set to the
+                        number of CPU cores.
+        out           : np.ndarray of shape (n_samples, N), default None
+                        preallocated integer array, such as a numpy.memmap,
+                        into which labels are written as they are computed.
+        chunk_size    : int, default 256
+                        number of samples in each task sent to a process. At
+                        most two tasks per process are in flight, so beyond
+                        ``out`` memory stays within 2 * n_jobs * chunk_size rows.
+        fit_kw        : keyword arguments
+                        extra arguments passed down to ``SPENC.fit``.
+
+        Returns
+        -------
+
+        np.ndarray of shape (n_samples, N) with the int32 labels of each sample,
+        or ``out`` if provided.
+
+        """
+        W = spar.csr_matrix(W)
+        if fit_kw.pop("check_W", True):
+            check_weights(W)
+        if out is None:
+            out = np.empty((n_samples, W.shape[0]), dtype=np.int32)
+        elif out.shape != (n_samples, W.shape[0]):
+            raise ValueError(
+                f"out has shape {out.shape}, expected {(n_samples, W.shape[0])}"
+            )
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        seeds = seed.spawn(n_samples)
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+        if n_jobs == 1:
+            _sample_labels(self, W, distribution, fit_kw, seeds, out=out)
+            return out
+        starts = iter(range(0, n_samples, chunk_size))
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_sample_worker,
+            initargs=((self, W, distribution, fit_kw),),
+        ) as pool:
+            pending = {}
+
+            def submit(start):
+                chunk = seeds[start : start + chunk_size]
+                pending[pool.submit(_sample_chunk, chunk)] = start
+
+            for start in itertools.islice(starts, 2 * n_jobs):
+                submit(start)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start = pending.pop(future)
+                    labels = future.result()
+                    out[start : start + len(labels)] = labels
+                    for following in itertools.islice(starts, 1):
+                        submit(following)
+        return out
+
+
+_sample_worker = {}
+
+
+def _init_sample_worker(args):
+    """
+    Process pool initializer storing the model, W, distribution and fit
+    arguments of ``SPENC.sample_batch``, so tasks only carry their seeds.
+    """
+    _sample_worker["args"] = args
+
+
+def _sample_chunk(seeds):
+    return _sample_labels(*_sample_worker["args"], seeds)
+
+
+def _sample_labels(model, W, distribution, fit_kw, seeds, out=None):
+    """
+    Labels of one random clustering per seed, reusing the edges of W for every
+    sample's affinity, written row by row into ``out`` if given. Used by
+    ``SPENC.sample_batch``, possibly in a worker process.
+    """
+    n_samples = W.shape[0]
+    rows = np.repeat(np.arange(n_samples), np.diff(W.indptr))
+    labels = np.empty((len(seeds), n_samples), dtype=np.int32) if out is None else out
+    for i, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        if distribution is None:
+            weights = rng.normal(0, 1, size=(n_samples, 1))
+        else:
+            weights = distribution(rng)
+        sample = clone(model)
+        if sample.random_state is None:
+            sample.random_state = int(rng.integers(2**32 - 1))
+        if sample.affinity in ("nearest_neighbors", "precomputed"):
+            sample.fit(weights, W, check_W=False, **fit_kw)
+        else:
+            kernel = edge_kernels(
+                weights,
+                rows,
+                W.indices,
+                metric=sample.affinity,
+                **sample._kernel_params(),
+            )
+            affinity = spar.csr_matrix(
+                (W.data * kernel, W.indices, W.indptr), shape=W.shape
+            )
+            sample.fit(None, affinity, check_W=False, **fit_kw)
+        labels[i] = sample.labels_
+    return labels
+
 
 class AgglomerativeClustering(clust.AgglomerativeClustering):
     def _sample_gen(self, n_samples=25, distribution=None):
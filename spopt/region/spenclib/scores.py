@@ -1,15 +1,50 @@
-# ruff: noqa: N803
+# ruff: noqa: N803, N806
 
 import numpy as np
+import scipy.sparse as sp
 
 
-def boundary_fraction(W, labels):
-    """"""
-    boundary = 0
-    for row, own_label in zip(W, labels, strict=True):
-        neighbor_labels = labels[row.nonzero()[-1]]
-        boundary += (neighbor_labels != own_label).any().astype(int)
-    return boundary / W.shape[0]
+def boundary_fraction(W, labels, X=None):  # noqa: ARG001
+    """
+    Fraction of observations with at least one neighbor in W assigned to a
+    different region.
+
+    Computed over the CSR ``indptr``/``indices`` arrays of W at once, comparing
+    the label of every neighbor to the label of its row.
+
+    Parameters
+    ----------
+
+    W       : sparse array or numpy array (N,N)
+              array representation of spatial relationships
+    labels  : numpy array (N,) or (S,N)
+              vector of labels aligned with W, or a stack of S such vectors
+    X       : numpy array (N,P), default None
+              ignored, accepted so that this can be used as ``spatial_score``
+              in ``SPENC.score``.
+
+    Returns
+    -------
+
+    the boundary fraction, as a float for a single labeling or
+    as a numpy array (S,) for a stack of labelings.
+    """
+    W = sp.csr_matrix(W)
+    if (W.data == 0).any():
+        W = W.copy()
+        W.eliminate_zeros()
+    n = W.shape[0]
+    labels = np.asarray(labels)
+    stack = np.atleast_2d(labels)
+    rows = np.repeat(np.arange(n), np.diff(W.indptr))
+    differs = stack[:, W.indices] != stack[:, rows]
+    # flat (labeling, row) ids of every neighbor pair that crosses regions
+    boundary_rows = (np.arange(stack.shape[0])[:, None] * n + rows)[differs]
+    on_boundary = np.bincount(boundary_rows, minlength=stack.size) > 0
+    fraction = on_boundary.reshape(stack.shape).sum(axis=1) / n
+    if labels.ndim == 1:
+        return fraction[0]
+    return fraction
 
 
 def boundary_score(W, labels):
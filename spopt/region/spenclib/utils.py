@@ -1,17 +1,19 @@
-# ruff: noqa: N803
+# ruff: noqa: N803, N806
 
 from warnings import warn
 
 import numpy as np
 import scipy.sparse as sp
 import scipy.sparse.csgraph as csg
+from sklearn.metrics.pairwise import KERNEL_PARAMS
+from sklearn.neighbors import NearestNeighbors
 
 
 def check_weights(W, X=None):
     if X is not None:
-        assert (
-            W.shape[0] == X.shape[0]
-        ), "W does not have the same number of samples as X"
+        assert W.shape[0] == X.shape[0], (
+            "W does not have the same number of samples as X"
+        )
     graph = sp.csc_matrix(W)
     graph.eliminate_zeros()
     components, labels = csg.connected_components(graph)
@@ -24,6 +26,215 @@ def check_weights(W, X=None):
     return W
 
 
+def contiguous_labels(W, labels):
+    """
+    Make every cluster of a labeling connected in a spatial weights graph.
+
+    Each cluster keeps its largest connected piece. Its other pieces are
+    dissolved and regrown, a ring of neighbours at a time, into the adjacent
+    cluster sharing the most weight with them, so every observation joins a
+    cluster it touches and the number of clusters is unchanged.
+
+    Parameters
+    ----------
+
+    W      : sparse or dense array of shape (N, N)
+             matrix expressing the pairwise spatial relationships
+             between N observations.
+    labels : np.ndarray of shape (N,)
+             cluster label of each observation.
+
+    Returns
+    -------
+
+    np.ndarray of shape (N,) with the relabeled clusters. Observations in a
+    component of ``W`` holding none of the kept pieces keep their label.
+    """
+    graph = sp.csr_matrix(W, dtype=np.float64)
+    graph.eliminate_zeros()
+    classes, codes = np.unique(np.asarray(labels), return_inverse=True)
+    n = codes.shape[0]
+
+    # split every cluster into its connected pieces
+    edges = graph.tocoo()
+    same = codes[edges.row] == codes[edges.col]
+    within = sp.csr_matrix(
+        (edges.data[same], (edges.row[same], edges.col[same])), shape=graph.shape
+    )
+    n_pieces, piece = csg.connected_components(within, directed=False)
+    piece_size = np.bincount(piece)
+    piece_code = np.empty(n_pieces, dtype=codes.dtype)
+    piece_code[piece] = codes
+
+    # the largest piece of each cluster is its core
+    by_size = np.lexsort((-piece_size, piece_code))
+    largest = np.ones(n_pieces, dtype=bool)
+    largest[1:] = piece_code[by_size][1:] != piece_code[by_size][:-1]
+    core = np.zeros(n_pieces, dtype=bool)
+    core[by_size[largest]] = True
+    assigned = core[piece]
+
+    while not assigned.all():
+        stray = np.flatnonzero(~assigned)
+        members = np.flatnonzero(assigned)
+        onehot = sp.csr_matrix(
+            (np.ones(members.shape[0]), (members, codes[members])),
+            shape=(n, classes.shape[0]),
+        )
+        votes = graph[stray] @ onehot
+        reached = votes.getnnz(axis=1) > 0
+        if not reached.any():
+            break
+        codes[stray[reached]] = np.asarray(votes[reached].argmax(axis=1)).ravel()
+        assigned[stray[reached]] = True
+    return classes[codes]
+
+
+def edge_kernels(X, rows, cols, metric="rbf", chunk_size=2**14, **params):
+    """
+    Evaluate a pairwise kernel only for the pairs of observations
+    ``(rows[k], cols[k])``, such as the edges of a sparse spatial weights matrix,
+    instead of for all N x N pairs as in ``sklearn.metrics.pairwise_kernels``.
+
+    Parameters
+    ----------
+
+    X          : sparse or dense array
+                 matrix containing P features for N observations.
+    rows, cols : np.ndarray of shape (E,)
+                 indices of the observations in each of the E pairs.
+    metric     : str or callable, default "rbf"
+                 one of the kernels in ``sklearn.metrics.pairwise.KERNEL_PARAMS``
+                 or a callable taking two feature vectors.
+    chunk_size : int, default 2**14
+                 number of pairs evaluated at once, bounding the temporary
+                 memory to chunk_size * P values.
+    params     : keyword arguments
+                 kernel parameters. As with ``filter_params=True`` in sklearn,
+                 parameters a named kernel does not accept are dropped, while
+                 a callable receives them all as keyword arguments.
+
+    Returns
+    -------
+
+    np.ndarray of shape (E,) containing the kernel value for each pair.
+    """
+    if not callable(metric):
+        if metric not in KERNEL_PARAMS:
+            raise ValueError(f"Unknown kernel {metric!r}")
+        params = {k: v for k, v in params.items() if k in KERNEL_PARAMS[metric]}
+    if sp.issparse(X):
+        # COO and other formats cannot be indexed by rows
+        X = sp.csr_matrix(X)
+    values = np.empty(len(rows))
+    for start in range(0, len(rows), chunk_size):
+        stop = start + chunk_size
+        left, right = X[rows[start:stop]], X[cols[start:stop]]
+        if sp.issparse(left):
+            left, right = left.toarray(), right.toarray()
+        values[start:stop] = _paired_kernel(left, right, metric, **params)
+    return values
+
+
+def knn_affinity(W, X, n_neighbors=10, chunk_size=2**12, n_jobs=None):
+    """
+    Build the symmetric nearest neighbors affinity
+    ``0.5 * (connectivity + connectivity.T)`` of ``kneighbors_graph`` with
+    ``include_self=True``, restricted to the edges of a spatial weights matrix
+    and scaled by their weights.
+
+    The neighbors of each block of ``chunk_size`` rows are looked up in a
+    tree over X and checked against the edges of W in those rows, so only
+    the hits on edges of W are kept and the full N x n_neighbors graph is
+    never held in memory.
+
+    Parameters
+    ----------
+
+    W           : sparse or dense array of shape (N, N)
+                  matrix expressing the pairwise spatial relationships
+                  between N observations.
+    X           : sparse or dense array
+                  matrix containing P features for N observations.
+    n_neighbors : int, default 10
+                  number of neighbors of each observation, counting itself.
+    chunk_size  : int, default 2**12
+                  number of observations whose neighbors are queried at once.
+    n_jobs      : int, default None
+                  number of parallel jobs for the neighbor queries.
+
+    Returns
+    -------
+
+    scipy.sparse.csr_matrix of shape (N, N) with the affinity on each edge of W.
+    """
+    if sp.issparse(X):
+        X = sp.csr_matrix(X)
+    weights = sp.csr_matrix(W)
+    # test both directions of every edge so the transpose below is complete
+    pattern = sp.csr_matrix(abs(weights) + abs(weights.T))
+    pattern.sort_indices()
+    rows = np.repeat(np.arange(weights.shape[0]), np.diff(pattern.indptr))
+    tree = NearestNeighbors(
+        n_neighbors=n_neighbors,
+        algorithm="auto" if sp.issparse(X) else "ball_tree",
+        n_jobs=n_jobs,
+    ).fit(X)
+    hit = np.zeros(pattern.nnz, dtype=bool)
+    for start in range(0, weights.shape[0], chunk_size):
+        stop = min(start + chunk_size, weights.shape[0])
+        neighbors = tree.kneighbors(X[start:stop], return_distance=False)
+        edges = slice(pattern.indptr[start], pattern.indptr[stop])
+        near = neighbors[rows[edges] - start]
+        hit[edges] = (near == pattern.indices[edges, None]).any(axis=1)
+    connectivity = sp.csr_matrix(
+        (hit.astype(float), pattern.indices, pattern.indptr), shape=weights.shape
+    )
+    return weights.multiply(0.5 * (connectivity + connectivity.T)).tocsr()
+
+
+def _paired_kernel(A, B, metric, **params):
+    """
+    Kernel between matching rows of A and B, mirroring
+    the definitions in ``sklearn.metrics.pairwise``. A callable metric
+    receives every parameter, as in ``sklearn.metrics.pairwise_kernels``.
+    """
+    if callable(metric):
+        return np.fromiter(
+            (metric(a, b, **params) for a, b in zip(A, B, strict=True)),
+            dtype=float,
+            count=A.shape[0],
+        )
+    gamma = params.get("gamma")
+    degree = params.get("degree", 3)
+    coef0 = params.get("coef0", 1)
+    if gamma is None:
+        gamma = 1.0 if metric == "chi2" else 1.0 / A.shape[1]
+    if metric == "rbf":
+        return np.exp(-gamma * ((A - B) ** 2).sum(axis=1))
+    if metric == "laplacian":
+        return np.exp(-gamma * np.abs(A - B).sum(axis=1))
+    if metric in ("additive_chi2", "chi2"):
+        numerator = (A - B) ** 2
+        denominator = A + B
+        nonzero = denominator != 0
+        ratio = np.zeros_like(numerator)
+        ratio[nonzero] = numerator[nonzero] / denominator[nonzero]
+        additive = -ratio.sum(axis=1)
+        return additive if metric == "additive_chi2" else np.exp(gamma * additive)
+    dot = np.einsum("ij,ij->i", A, B)
+    if metric == "linear":
+        return dot
+    if metric in ("poly", "polynomial"):
+        return (gamma * dot + coef0) ** degree
+    if metric == "sigmoid":
+        return np.tanh(gamma * dot + coef0)
+    # cosine
+    norms = np.linalg.norm(A, axis=1) * np.linalg.norm(B, axis=1)
+    norms[norms == 0] = 1
+    return dot / norms
+
+
 def lattice(x, y):
     """
     Construct a lattice of unit squares of dimension (x,y)
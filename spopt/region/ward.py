@@ -1,6 +1,13 @@
 # ruff: noqa: B006, C408
 
-from sklearn.cluster import AgglomerativeClustering
+import warnings
+from heapq import heapify, heappop, heappush, heappushpop
+
+import numpy
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import AgglomerativeClustering, ward_tree
+from sklearn.metrics import pairwise_distances_argmin_min
 
 from ..BaseClass import BaseSpOptHeuristicSolver
 
@@ -23,12 +30,31 @@ class WardSpatial(BaseSpOptHeuristicSolver):
     clustering_kwds: dict
         Other parameters about clustering could be used in
         ``sklearn.cluster.AgglometariveClustering.``
+    cache_tree : bool (default False)
+        Build the full constrained Ward tree, with merge distances, on the
+        first call to ``solve`` or ``cut`` and keep it on the solver. Labels
+        for any number of clusters or distance threshold are then cut from
+        the cached tree in :math:`O(n)` instead of refitting. Only
+        ``distance_threshold`` is used from ``clustering_kwds``, in which case
+        ``n_clusters`` must be ``None``.
+    low_memory : bool (default False)
+        Build the tree without ``sklearn``, on ``float32`` features and the
+        edges of ``w`` only, so that peak memory stays :math:`O(|E|)` for very
+        large numbers of areas. The tree is cached as with ``cache_tree=True``.
+        If ``w`` is disconnected, its components are first linked by their
+        closest areas, as ``sklearn`` does, so the tree is the same.
 
     Returns
     -------
 
     labels_ : numpy.array
         Cluster labels for observations.
+    children_ : numpy.array
+        The children of each merge in the cached tree, as in
+        ``sklearn.cluster.AgglomerativeClustering``, if ``cache_tree=True``.
+    distances_ : numpy.array
+        The Ward distance of each merge in the cached tree,
+        if ``cache_tree=True``.
 
 
     Examples
@@ -68,17 +94,39 @@ class WardSpatial(BaseSpOptHeuristicSolver):
            [ 6,  1],
            [ 7,  1]])
 
+    Cache the tree to scan many numbers of clusters without refitting.
+
+    >>> model = WardSpatial(chicago, w, attrs_name, cache_tree=True)
+    >>> labels = {k: model.cut(k) for k in range(2, 20)}
+
     """
 
-    def __init__(self, gdf, w, attrs_name, n_clusters=5, clustering_kwds=dict()):
+    def __init__(
+        self,
+        gdf,
+        w,
+        attrs_name,
+        n_clusters=5,
+        clustering_kwds=dict(),
+        cache_tree=False,
+        low_memory=False,
+    ):
         self.gdf = gdf
         self.w = w
         self.attrs_name = attrs_name
         self.n_clusters = n_clusters
         self.clustering_kwds = clustering_kwds
+        self.cache_tree = cache_tree
+        self.low_memory = low_memory
 
     def solve(self):
         """Solve the Ward"""
+        if self.cache_tree or self.low_memory:
+            self.labels_ = self.cut(
+                n_clusters=self.n_clusters,
+                distance_threshold=self.clustering_kwds.get("distance_threshold"),
+            )
+            return
         data = self.gdf
         x = data[self.attrs_name].values
         model = AgglomerativeClustering(
@@ -89,3 +137,244 @@ class WardSpatial(BaseSpOptHeuristicSolver):
         )
         model.fit(x)
         self.labels_ = model.labels_
+
+    def cut(self, n_clusters=None, distance_threshold=None):
+        """Cut the cached Ward tree, building it first if needed.
+
+        Parameters
+        ----------
+
+        n_clusters : int (default None)
+            The number of clusters to form.
+        distance_threshold : float (default None)
+            The merge distance at or above which clusters are not merged.
+            Exactly one of ``n_clusters`` and ``distance_threshold`` is set.
+
+        Returns
+        -------
+
+        labels : numpy.array
+            Cluster labels for observations, numbered as
+            ``sklearn.cluster.AgglomerativeClustering`` numbers the cut of a
+            full tree.
+
+        """
+        if (n_clusters is None) == (distance_threshold is None):
+            raise ValueError(
+                "Exactly one of n_clusters and distance_threshold has to be set, "
+                "and the other needs to be None."
+            )
+        if not hasattr(self, "children_") and self.low_memory:
+            x = self.gdf[self.attrs_name].to_numpy(dtype=numpy.float32)
+            self.children_, self.distances_ = _low_memory_ward_tree(x, self.w.sparse)
+        elif not hasattr(self, "children_"):
+            x = self.gdf[self.attrs_name].values
+            self.children_, _, _, _, self.distances_ = ward_tree(
+                x, connectivity=self.w.sparse, return_distance=True
+            )
+        if distance_threshold is not None:
+            n_clusters = numpy.count_nonzero(self.distances_ >= distance_threshold) + 1
+        return _cut_tree(self.children_, n_clusters)
+
+
+def _low_memory_ward_tree(x, adjacency, chunk_size=2**16):
+    """Build the full Ward tree of ``x`` merging adjacent clusters only.
+
+    Clusters are numbered as in ``sklearn.cluster.ward_tree``, a union-find
+    over these numbers resolves stale neighbors lazily, and a heap holds the
+    Ward distance of each adjacent pair. Only the pairs of clusters that are
+    neighbors are ever stored, so memory stays :math:`O(|E|)` besides the
+    centroids. A disconnected adjacency is completed first, as
+    ``sklearn.cluster.ward_tree`` completes it.
+
+    Parameters
+    ----------
+
+    x : numpy.array
+        Features of each area, of shape ``(n, p)``.
+    adjacency : scipy.sparse matrix
+        Adjacency between the areas, treated as undirected and unweighted.
+    chunk_size : int (default 2**16)
+        The number of edges whose first distances are computed at once.
+
+    Returns
+    -------
+
+    children : numpy.array
+        The children of the node formed by each merge, in merge order.
+    distances : numpy.array
+        The distance of each merge, scaled as ``sklearn.cluster.ward_tree``
+        scales them.
+
+    """
+
+    n = x.shape[0]
+    n_nodes = 2 * n - 1
+    adjacency = sparse.csr_matrix(adjacency, dtype=bool)
+    adjacency = (adjacency + adjacency.T).tocsr()
+    adjacency.setdiag(False)
+    adjacency.eliminate_zeros()
+    n_components, labels = connected_components(adjacency, directed=False)
+    if n_components > 1:
+        warnings.warn(
+            f"the number of connected components of the connectivity matrix is "
+            f"{n_components} > 1. Completing it to avoid stopping the tree early.",
+            stacklevel=3,
+        )
+        adjacency = _link_components(x, adjacency, n_components, labels)
+    indptr = adjacency.indptr
+    indices = adjacency.indices.astype(numpy.int32)
+    neighbors = [indices[indptr[i] : indptr[i + 1]] for i in range(n)]
+    neighbors.extend([None] * (n_nodes - n))
+    parent = numpy.arange(n_nodes, dtype=numpy.int32)
+    active = numpy.zeros(n_nodes, dtype=bool)
+    active[:n] = True
+    size = numpy.zeros(n_nodes, dtype=numpy.int64)
+    size[:n] = 1
+    centroid = numpy.zeros((n_nodes, x.shape[1]), dtype=numpy.float32)
+    centroid[:n] = x
+
+    # each edge once, as (distance, larger, smaller) like sklearn's first pass
+    lower = sparse.tril(adjacency, k=-1).tocoo()
+    distance = numpy.empty(lower.nnz)
+    for start in range(0, lower.nnz, chunk_size):
+        stop = start + chunk_size
+        gap = centroid[lower.row[start:stop]].astype(float)
+        gap -= centroid[lower.col[start:stop]]
+        distance[start:stop] = 0.5 * (gap * gap).sum(axis=1)
+    heap = list(
+        zip(distance.tolist(), lower.row.tolist(), lower.col.tolist(), strict=True)
+    )
+    del lower, distance
+    heapify(heap)
+    # stale pairs are dropped whenever they outnumber the edges
+    limit = 2 * len(heap) + n
+
+    children = numpy.empty((n - 1, 2), dtype=numpy.intp)
+    distances = numpy.empty(n - 1)
+    for node in range(n, n_nodes):
+        while True:
+            inertia, i, j = heappop(heap)
+            if active[i] and active[j]:
+                break
+        parent[i] = parent[j] = node
+        active[i] = active[j] = False
+        active[node] = True
+        size[node] = size[i] + size[j]
+        centroid[node] = (size[i] * centroid[i] + size[j] * centroid[j]) / size[node]
+        children[node - n] = j, i
+        distances[node - n] = inertia
+        # resolve the neighbors of both children to the clusters now holding them
+        others = _find(parent, numpy.concatenate((neighbors[i], neighbors[j])))
+        others = numpy.unique(others)
+        others = others[others != node]
+        neighbors[node] = others
+        neighbors[i] = neighbors[j] = None
+        inertias = _ward_distances(centroid, size, node, others)
+        for inertia, other in zip(inertias.tolist(), others.tolist(), strict=True):
+            heappush(heap, (inertia, node, other))
+        if len(heap) > limit:
+            heap = [pair for pair in heap if active[pair[1]] and active[pair[2]]]
+            heapify(heap)
+    return children, numpy.sqrt(2.0 * distances)
+
+
+def _ward_distances(centroid, size, node, others):
+    """Half the squared Ward distances between ``node`` and ``others``.
+
+    This is the Lance-Williams update for Ward linkage, taken from the merged
+    centroids so that it holds when only one child neighbors a cluster.
+    """
+    gap = centroid[others].astype(float) - centroid[node]
+    weight = size[others] * size[node] / (size[others] + size[node])
+    return weight * (gap * gap).sum(axis=1)
+
+
+def _find(parent, nodes):
+    """Clusters now holding ``nodes``, compressing their paths."""
+    roots = parent[nodes]
+    while True:
+        above = parent[roots]
+        if (above == roots).all():
+            break
+        roots = above
+    parent[nodes] = roots
+    return roots
+
+
+def _link_components(x, adjacency, n_components, labels):
+    """Link every pair of components of ``adjacency`` by their closest areas.
+
+    This completes the adjacency as ``sklearn.cluster.ward_tree`` does before
+    merging, but finds each closest pair in chunks rather than from the full
+    distance matrix between two components.
+    """
+    order = numpy.argsort(labels, kind="stable")
+    bounds = numpy.searchsorted(labels[order], numpy.arange(n_components + 1))
+    rows, cols = [], []
+    for i in range(n_components):
+        idx_i = order[bounds[i] : bounds[i + 1]]
+        for j in range(i):
+            idx_j = order[bounds[j] : bounds[j + 1]]
+            closest, distance = pairwise_distances_argmin_min(x[idx_i], x[idx_j])
+            ii = distance.argmin()
+            rows.append(idx_i[ii])
+            cols.append(idx_j[closest[ii]])
+    links = sparse.csr_matrix(
+        (numpy.ones(len(rows), dtype=bool), (rows, cols)), shape=adjacency.shape
+    )
+    return (adjacency + links + links.T).tocsr()
+
+
+def _cut_tree(children, n_clusters):
+    """Labels of the leaves of a full merge tree cut into ``n_clusters``.
+
+    Clusters are numbered as ``sklearn.cluster.AgglomerativeClustering``
+    numbers them, in the order of a heap of the nodes heading them. Only the
+    :math:`k` heads go through the heap, and the leaves are labelled from the
+    connected components of the merges below the cut.
+
+    Parameters
+    ----------
+
+    children : numpy.array
+        The children of the node formed by each merge, in merge order, where
+        nodes below ``n_leaves`` are leaves and node ``n_leaves + i`` is formed
+        by merge ``i``.
+    n_clusters : int
+        The number of clusters to form.
+
+    Returns
+    -------
+
+    labels : numpy.array
+        Cluster labels for the leaves.
+
+    """
+
+    n_leaves = len(children) + 1
+    if n_clusters > n_leaves:
+        raise ValueError(
+            "Cannot extract more clusters than samples: "
+            f"{n_clusters} clusters were given for a tree with {n_leaves} leaves."
+        )
+    # the last n_clusters - 1 merges are undone, leaving the nodes below them
+    heads = [-(2 * n_leaves - 2)]
+    for _ in range(n_clusters - 1):
+        left, right = children[-heads[0] - n_leaves].tolist()
+        heappush(heads, -left)
+        heappushpop(heads, -right)
+    heads = -numpy.array(heads)
+    n_kept = n_leaves - n_clusters
+    n_nodes = n_leaves + n_kept
+    # every kept merge links its node to both children
+    kept = children[:n_kept]
+    parents = numpy.repeat(numpy.arange(n_leaves, n_nodes), 2)
+    forest = sparse.csr_matrix(
+        (numpy.ones(2 * n_kept, dtype=bool), (parents, kept.ravel())),
+        shape=(n_nodes, n_nodes),
+    )
+    _, components = connected_components(forest, directed=False)
+    rank = numpy.empty(n_clusters, dtype=numpy.intp)
+    rank[components[heads]] = numpy.arange(n_clusters)
+    return rank[components[:n_leaves]]
@@ -4,7 +4,13 @@ import numpy
 import pytest
 from packaging.version import Version
 
-from spopt.region import RandomRegion, RandomRegions
+from spopt.region import (
+    RandomRegion,
+    RandomRegions,
+    iter_random_labels,
+    random_labels,
+)
+from spopt.region.components import Contiguity, check_contiguity
 
 # see gh:spopt#437
 LIBPYSAL_GE_48 = Version(libpysal.__version__) >= Version("4.8.0")
@@ -263,3 +269,95 @@ class TestRandomRegionsSynthetic:
         numpy.random.seed(60)
         model = RandomRegions(self.ids, **kwargs)
         assert known_region_0 == model.solutions[0].regions[0]
+
+    def test_random_labels(self, tmp_path):
+        kwargs = {
+            "num_regions": self.nregs,
+            "contiguity": self.w,
+            "permutations": self.permutations,
+        }
+        numpy.random.seed(100)
+        model = RandomRegions(self.ids, **kwargs)
+        numpy.random.seed(100)
+        streamed = list(iter_random_labels(self.ids, **kwargs))
+        numpy.random.seed(100)
+        out = numpy.lib.format.open_memmap(
+            tmp_path / "labels.npy",
+            mode="w+",
+            dtype=numpy.int32,
+            shape=(self.permutations, len(self.ids)),
+        )
+        stored = random_labels(self.ids, out=out, **kwargs)
+
+        assert stored is out
+        for solution, labels, row in zip(
+            model.solutions, streamed, stored, strict=True
+        ):
+            assert labels.dtype == numpy.int32
+            numpy.testing.assert_array_equal(labels, solution.get_labels())
+            numpy.testing.assert_array_equal(labels, row)
+            for label, region in enumerate(solution.regions):
+                assert (labels[region] == label).all()
+
+    def test_random_labels_bad_out(self):
+        with pytest.raises(ValueError, match="`out` has shape"):
+            random_labels(self.ids, permutations=2, out=numpy.empty((3, 100)))
+
+    def test_random_regions_seed_n_jobs(self):
+        w = libpysal.weights.lat2W(6, 6, rook=True)
+        ids = w.id_order
+        kwargs = {
+            "num_regions": 3,
+            "contiguity": w,
+            "permutations": self.permutations,
+            "seed": RANDOM_STATE,
+        }
+        serial = RandomRegions(ids, **kwargs)
+        parallel = RandomRegions(ids, n_jobs=2, **kwargs)
+        for a, b in zip(serial.solutions, parallel.solutions, strict=True):
+            assert a.regions == b.regions
+
+        # permutation k is drawn from the k-th child seed
+        children = numpy.random.SeedSequence(RANDOM_STATE).spawn(self.permutations)
+        third = RandomRegion(ids, 3, contiguity=w, maxiter=100, seed=children[2])
+        assert third.regions == serial.solutions[2].regions
+
+        streamed = random_labels(ids, n_jobs=2, **kwargs)
+        for solution, labels in zip(serial.solutions, streamed, strict=True):
+            numpy.testing.assert_array_equal(solution.get_labels(), labels)
+
+        # a SeedSequence is spawned from directly
+        for n_jobs in (1, 2):
+            kwargs["seed"] = numpy.random.SeedSequence(RANDOM_STATE)
+            sequence = RandomRegions(ids, n_jobs=n_jobs, **kwargs)
+            for a, b in zip(serial.solutions, sequence.solutions, strict=True):
+                assert a.regions == b.regions
+
+    def test_random_region_pickle(self):
+        import copy
+        import pickle
+
+        w = libpysal.weights.lat2W(6, 6, rook=True)
+        for seed in (None, RANDOM_STATE):
+            region = RandomRegion(w.id_order, 3, contiguity=w, seed=seed)
+            assert "_rng" not in vars(region)
+            restored = pickle.loads(pickle.dumps(region))
+            assert restored.regions == region.regions
+            assert copy.deepcopy(region).regions == region.regions
+
+    def test_contiguity(self):
+        sparse = SYNTH_W.sparse
+        contiguity = Contiguity(sparse.indptr, sparse.indices)
+        # an L of 0, 1, 2 and 12, plus a stray 45
+        assert contiguity.is_component([0, 1, 2, 12])
+        assert not contiguity.is_component([0, 1, 2, 12, 45])
+        assert contiguity.is_component([])
+        rng = numpy.random.default_rng(RANDOM_STATE)
+        for size in [1, 2, 10, 30]:
+            ids = rng.choice(100, size=size, replace=False).tolist()
+            known = [check_contiguity(SYNTH_W, ids, leaver) for leaver in ids]
+            observed = [contiguity.check_contiguity(ids, leaver) for leaver in ids]
+            assert observed == known
+            assert contiguity.removable(ids).tolist() == known
+        ids = [0, 1, 2, 12, 45]
+        assert contiguity.removable(ids).tolist() == [False] * 4 + [True]
@@ -57,3 +57,86 @@ class TestRegionKMeansHeuristic:
 
         labs_ = model.labels_[: self.limit_index]
         numpy.testing.assert_equal(labs_, self.known_labels_large)
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_centroid_and_closest(self):
+        from spopt.region.base import _centroid, _closest, _refresh_closest
+
+        rng = numpy.random.default_rng(RANDOM_STATE)
+        data = rng.normal(size=(50, 3))
+        regions = [list(range(0, 20)), list(range(20, 35)), list(range(35, 50))]
+        centroids = _centroid(regions, data)
+        expected = [data[region].mean(axis=0) for region in regions]
+        numpy.testing.assert_allclose(centroids, expected)
+
+        closest = _closest(data, centroids)
+        expected = [((row - centroids) ** 2).sum(axis=1).argmin() for row in data]
+        numpy.testing.assert_array_equal(closest, expected)
+
+        # moving two centroids refreshes exactly the affected rows
+        distances = ((data[:, None] - centroids) ** 2).sum(axis=2)
+        centroids[[0, 2]] = rng.normal(size=(2, 3))
+        _refresh_closest(data, centroids, distances, closest, [0, 2])
+        numpy.testing.assert_array_equal(closest, _closest(data, centroids))
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_contiguity_oracle(self):
+        from spopt.region.base import ContiguityOracle
+
+        # 3 x 3 lattice
+        # 0 0 1
+        # 2 0 1
+        # 2 2 1
+        labels = numpy.array([0, 0, 1, 2, 0, 1, 2, 2, 1])
+        oracle = ContiguityOracle(self.w_small, labels)
+
+        # 1 holds region 0 together
+        assert not oracle.move_ok(1, 1)
+        # 3 does not touch region 1
+        assert not oracle.move_ok(3, 1)
+        assert oracle.move_ok(4, 1)
+        assert oracle.move_ok(7, 0)
+
+        oracle.move(7, 0)
+        assert labels[7] == 0
+        # 4 now holds region 0 together
+        assert not oracle.move_ok(4, 1)
+
+        oracle.move(3, 0)
+        # region 2 would be left empty
+        assert not oracle.move_ok(6, 0)
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_region_k_means_unreachable(self):
+        from spopt.region.region_k_means import region_k_means
+
+        # areas 0-2 form a path and area 3 is an island
+        w = libpysal.weights.W(
+            {0: [1], 1: [0, 2], 2: [1], 3: []}, silence_warnings=True
+        )
+        data = numpy.arange(8.0).reshape(4, 2)
+        with pytest.raises(ValueError, match="1 areas cannot be reached"):
+            region_k_means(data, 2, w, seed=4)
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_region_k_means_heuristic_n_init(self):
+        w = libpysal.weights.lat2W(10, 10)
+        data = numpy.random.default_rng(RANDOM_STATE).normal(size=(100, 2))
+
+        single = RegionKMeansHeuristic(data, 4, w, seed=RANDOM_STATE)
+        single.solve()
+        serial = RegionKMeansHeuristic(data, 4, w, seed=RANDOM_STATE, n_init=3)
+        serial.solve()
+        parallel = RegionKMeansHeuristic(
+            data, 4, w, seed=RANDOM_STATE, n_init=3, n_jobs=2
+        )
+        parallel.solve()
+
+        numpy.testing.assert_array_equal(
+            serial.run_seeds_, RANDOM_STATE + numpy.arange(3)
+        )
+        assert serial.run_inertias_[0] == single.inertia_
+        assert serial.inertia_ == serial.run_inertias_.min()
+        assert serial.iters_ == serial.run_iters_[serial.run_inertias_.argmin()]
+        numpy.testing.assert_array_equal(serial.labels_, parallel.labels_)
+        numpy.testing.assert_array_equal(serial.run_inertias_, parallel.run_inertias_)
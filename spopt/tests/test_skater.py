@@ -189,3 +189,265 @@ class TestSkater:
             model.solve()
 
         numpy.testing.assert_equal(model.labels_, self.columbus_labels_2)
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_quorum_feasible(self):
+        from scipy.sparse import csgraph
+
+        from spopt.region.skater import SpanningForest
+
+        x = self.mexico[self.default_attrs_mexico].values
+        model = SpanningForest()
+        model.fit(1, self.w_mexico, data=x)
+        msf = model.minimum_spanning_forest_
+        n_subtrees, labels = csgraph.connected_components(msf, directed=False)
+        edges = numpy.vstack(msf.nonzero()).T
+        observed = model._quorum_feasible(msf, edges, 8, n_subtrees, labels)
+
+        expected = []
+        for in_node, out_node in edges:
+            local_msf = msf.copy()
+            local_msf[in_node, out_node] = 0
+            local_msf.eliminate_zeros()
+            _, local_labels = csgraph.connected_components(local_msf, directed=False)
+            expected.append(numpy.bincount(local_labels).min() >= 8)
+
+        numpy.testing.assert_equal(observed, expected)
+        assert 0 < observed.sum() < len(edges)
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_kruskal(self):
+        numpy.random.seed(RANDOM_STATE)
+        model = Skater(
+            self.mexico,
+            self.w_mexico,
+            self.default_attrs_mexico,
+            spanning_forest_kwds={"mst": "kruskal"},
+        )
+        model.solve()
+
+        numpy.testing.assert_equal(model.labels_, self.default_mexico)
+
+    def test_skater_bad_mst(self):
+        from spopt.region.skater import SpanningForest
+
+        with pytest.raises(ValueError, match="`mst` must be 'scipy', 'kruskal'"):
+            SpanningForest(mst="prim")
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_forest_cache(self):
+        from scipy.sparse import csgraph
+
+        from spopt.region.skater import SpanningForest, _weights_cache
+
+        calls = []
+
+        def backend(dissim):
+            calls.append(dissim.shape)
+            return csgraph.minimum_spanning_tree(dissim)
+
+        x = self.mexico[self.default_attrs_mexico].values
+        model = SpanningForest(mst=backend)
+        model.fit(5, self.w_mexico, data=x)
+        (msf,) = _weights_cache(self.w_mexico)["forests"].values()
+        assert not hasattr(self.w_mexico, "_spanning_forest_cache")
+        n_edges = msf.nnz
+
+        # the cached forest is reused and never pruned in place
+        model.fit(5, self.w_mexico, data=x)
+        assert len(calls) == 1
+        assert msf.nnz == n_edges
+        numpy.testing.assert_equal(model.current_labels_, self.default_mexico)
+
+        # a precomputed forest can be passed in directly, in either triangle
+        model = SpanningForest()
+        for forest in (msf, msf.T.tocsr(), (msf + msf.T).tocsr()):
+            model.fit(5, self.w_mexico, data=x, MSF=forest)
+            numpy.testing.assert_equal(model.current_labels_, self.default_mexico)
+
+        # but it is not cached, as it need not be minimal
+        _weights_cache(self.w_mexico).clear()
+        model.fit(5, self.w_mexico, data=x, MSF=msf)
+        assert "forests" not in _weights_cache(self.w_mexico)
+
+        # only the most recently used forests are kept
+        model = SpanningForest(mst=backend, forest_cache_size=2)
+        for scale in [2, 3, 4]:
+            model.fit(5, self.w_mexico, data=x * scale)
+        assert len(_weights_cache(self.w_mexico)["forests"]) == 2
+        model.fit(5, self.w_mexico, data=x * 4)
+        assert len(calls) == 4
+        model.fit(5, self.w_mexico, data=x * 2)
+        assert len(calls) == 5
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_bad_forest(self):
+        from scipy import sparse
+
+        from spopt.region.skater import SpanningForest, _weights_cache
+
+        x = self.mexico[self.default_attrs_mexico].values
+        model = SpanningForest()
+        with pytest.raises(ValueError, match="`MSF` has shape"):
+            model.fit(5, self.w_mexico, data=x, MSF=sparse.csr_matrix((31, 31)))
+        # an edge between areas that are not neighbors
+        w = self.w_mexico.sparse
+        stray = 1 + next(j for j in range(31) if w[0, j + 1] == 0)
+        stray = sparse.csr_matrix(([1.0], ([0], [stray])), shape=w.shape)
+        with pytest.raises(ValueError, match="edges that are not in the weights"):
+            model.fit(5, self.w_mexico, data=x, MSF=stray)
+        # a single edge does not span the weights
+        edge = sparse.csr_matrix(([1.0], ([0], [w.indices[0]])), shape=w.shape)
+        with pytest.raises(ValueError, match="is not a spanning forest"):
+            model.fit(5, self.w_mexico, data=x, MSF=edge)
+        assert "forests" not in _weights_cache(self.w_mexico)
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_callback(self):
+        events = []
+        model = Skater(
+            self.mexico,
+            self.w_mexico,
+            self.default_attrs_mexico,
+            spanning_forest_kwds={"callback": events.append},
+        )
+        model.solve()
+
+        phases = [e["phase"] for e in events if e["event"] == "phase"]
+        assert phases == ["kernel", "mst", "components"]
+        searches = [e for e in events if e["event"] == "find_cut"]
+        cuts = [e for e in events if e["event"] == "cut"]
+        assert len(searches) == len(cuts) == 4
+        assert [c["n_subtrees"] for c in cuts] == [2, 3, 4, 5]
+        assert [s["n_candidates"] for s in searches] == [31, 30, 29, 28]
+        assert all(s["n_evaluated"] == s["n_candidates"] for s in searches)
+        assert [s["score"] for s in searches] == [c["score"] for c in cuts]
+        assert events[-1]["event"] == "fit"
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_callback_kernel_phase(self):
+        import time
+
+        def slow_distances(x, y):
+            # only the kernel between neighbors is slowed down, not the scores
+            if len(y) > 1:
+                time.sleep(0.2)
+            return skm.manhattan_distances(x, y)
+
+        events = []
+        model = Skater(
+            self.mexico,
+            self.w_mexico,
+            self.default_attrs_mexico,
+            spanning_forest_kwds={
+                "dissimilarity": slow_distances,
+                "callback": events.append,
+            },
+        )
+        model.solve()
+
+        (kernel,) = [e for e in events if e.get("phase") == "kernel"]
+        assert kernel["elapsed"] >= 0.2
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_edge_dissimilarity(self):
+        from scipy import sparse
+
+        from spopt.region.skater import SpanningForest
+
+        w = libpysal.weights.lat2W(10, 10).sparse
+        edges = sparse.triu(w, k=1, format="coo")
+        x = numpy.random.default_rng(RANDOM_STATE).uniform(size=(100, 3))
+        calls = []
+
+        def distances(x, y):
+            calls.append(x.shape[0] * y.shape[0])
+            return skm.manhattan_distances(x, y)
+
+        def affinity(x, y):
+            return skm.rbf_kernel(x, y, gamma=0.5)
+
+        for kwargs, dense in [
+            ({}, skm.manhattan_distances(x)),
+            ({"dissimilarity": skm.euclidean_distances}, skm.euclidean_distances(x)),
+            ({"dissimilarity": distances}, skm.manhattan_distances(x)),
+            ({"dissimilarity": None, "affinity": affinity}, -numpy.log(affinity(x, x))),
+        ]:
+            model = SpanningForest(**kwargs)
+            observed = model._edge_dissimilarity(x, edges.row, edges.col, chunk_size=7)
+            numpy.testing.assert_allclose(observed, dense[edges.row, edges.col])
+        # the metric never sees all pairs at once
+        assert max(calls) < 100 * 100 / 4
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_callback_logger(self, caplog):
+        import logging
+
+        with caplog.at_level(logging.INFO, logger="spopt.region.skater"):
+            Skater(self.mexico, self.w_mexico, self.default_attrs_mexico).solve()
+
+        events = [r.skater_event["event"] for r in caplog.records]
+        assert events.count("cut") == 4
+        assert events[-1] == "fit"
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_batch(self):
+        from spopt.region import SkaterBatch
+
+        attrs = [
+            self.default_attrs_mexico,
+            self.default_attrs_mexico[:3],
+            ["PCGDP1940"],
+        ]
+        data = [self.mexico[a].values for a in attrs]
+        model = SkaterBatch(self.w_mexico, data, n_clusters=5, floor=3, n_jobs=2)
+        model.solve()
+        serial = SkaterBatch(self.w_mexico, data, n_clusters=5, floor=3)
+        serial.solve()
+
+        assert model.labels_.shape == (3, 32)
+        numpy.testing.assert_equal(model.labels_, serial.labels_)
+        for attr, labels in zip(attrs, model.labels_, strict=True):
+            single = Skater(self.mexico, self.w_mexico, attr, n_clusters=5, floor=3)
+            single.solve()
+            numpy.testing.assert_equal(labels, single.labels_)
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_batch_shape_mismatch(self):
+        from spopt.region import SkaterBatch
+
+        data = [numpy.ones((31, 2))]
+        with pytest.raises(ValueError, match="Scenario 0 has 31 observations"):
+            SkaterBatch(self.w_mexico, data).solve()
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_skater_does_not_mutate_w(self):
+        self.w_mexico.transform = "r"
+        weighted = self.w_mexico.sparse
+        model = Skater(self.mexico, self.w_mexico, self.default_attrs_mexico)
+        model.solve()
+
+        assert self.w_mexico.transform == "R"
+        assert self.w_mexico.sparse is weighted
+        numpy.testing.assert_equal(model.labels_, self.default_mexico)
+        assert not hasattr(self.w_mexico, "_binary_sparse")
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    def test_binary_sparse_cache(self):
+        import gc
+
+        from spopt.region.skater import _binary_sparse, _weights_caches
+
+        w = libpysal.weights.lat2W(3, 3)
+        binary = _binary_sparse(w)
+        assert _binary_sparse(w) is binary
+        # a new transform gives a new weighted matrix, so the view is rebuilt
+        w.transform = "r"
+        rebuilt = _binary_sparse(w)
+        assert rebuilt is not binary
+        numpy.testing.assert_equal(rebuilt.toarray(), binary.toarray())
+        # the cache goes with the weights
+        key = id(w)
+        del w
+        gc.collect()
+        assert key not in _weights_caches
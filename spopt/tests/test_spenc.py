@@ -1,6 +1,7 @@
 import geopandas
 import libpysal
 import numpy
+import pytest
 from packaging.version import Version
 
 from spopt.region import Spenc
@@ -39,3 +40,344 @@ class TestSpenc:
         model.solve()
 
         numpy.testing.assert_equal(model.labels_, self.non_default_mexico)
+
+    def test_edge_kernels(self):
+        from sklearn.metrics.pairwise import KERNEL_PARAMS, pairwise_kernels
+
+        from spopt.region.spenclib.utils import edge_kernels
+
+        x = numpy.abs(self.mexico[self.default_attrs_mexico].values / 10_000)
+        edges = self.w_mexico.sparse.tocoo()
+        params = {"gamma": 0.5, "degree": 2, "coef0": 1}
+        for metric in KERNEL_PARAMS:
+            dense = pairwise_kernels(x, metric=metric, filter_params=True, **params)
+            observed = edge_kernels(
+                x, edges.row, edges.col, metric=metric, chunk_size=7, **params
+            )
+            numpy.testing.assert_allclose(observed, dense[edges.row, edges.col])
+
+        def metric(a, b):
+            return numpy.minimum(a, b).sum()
+
+        dense = pairwise_kernels(x, metric=metric)
+        observed = edge_kernels(x, edges.row, edges.col, metric=metric)
+        numpy.testing.assert_allclose(observed, dense[edges.row, edges.col])
+
+    def test_spenc_callable_affinity_kernel_params(self):
+        from sklearn.metrics.pairwise import pairwise_kernels
+
+        from spopt.region.spenclib import SPENC
+
+        x = numpy.abs(self.mexico[self.default_attrs_mexico].values / 10_000)
+        w = self.w_mexico.sparse
+
+        def metric(a, b, scale=1.0, offset=0.0):
+            return numpy.exp(-scale * numpy.abs(a - b).sum()) + offset
+
+        kernel_params = {"scale": 0.5, "offset": 0.25}
+        model = SPENC(
+            n_clusters=3,
+            affinity=metric,
+            kernel_params=kernel_params,
+            random_state=RANDOM_STATE,
+        )
+        model.fit(x, w)
+
+        dense = pairwise_kernels(x, metric=metric, **kernel_params)
+        edges = w.tocoo()
+        observed = model.attribute_affinity_.toarray()[edges.row, edges.col]
+        numpy.testing.assert_allclose(observed, dense[edges.row, edges.col])
+        assert model.labels_.shape == (32,)
+
+    @pytest.mark.parametrize("affinity", ["rbf", "nearest_neighbors"])
+    def test_spenc_sparse_x(self, affinity):
+        from scipy import sparse
+
+        from spopt.region.spenclib import SPENC
+
+        x = numpy.abs(self.mexico[self.default_attrs_mexico].values / 10_000)
+        w = self.w_mexico.sparse
+        labels = []
+        for features in (x, sparse.coo_matrix(x), sparse.csc_matrix(x)):
+            model = SPENC(
+                n_clusters=3,
+                affinity=affinity,
+                n_neighbors=5,
+                random_state=RANDOM_STATE,
+            )
+            labels.append(model.fit(features, w).labels_)
+        numpy.testing.assert_array_equal(labels[0], labels[1])
+        numpy.testing.assert_array_equal(labels[0], labels[2])
+
+    def test_spenc_hierarchical(self):
+        from spopt.region.spenclib import SPENC
+
+        x = self.mexico[self.default_attrs_mexico].values
+        model = SPENC(
+            n_clusters=4,
+            gamma=1e-9,
+            assign_labels="hierarchical",
+            random_state=RANDOM_STATE,
+        )
+        model.fit(x, self.w_mexico.sparse)
+
+        known = [2, 2, 2, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 1, 0, 3]
+        known += [1, 3, 3, 3, 3, 3, 2, 2, 2, 2, 2, 3, 3, 3, 3, 3]
+        numpy.testing.assert_equal(model.labels_, known)
+
+    def test_spenc_hierarchical_floor(self):
+        from spopt.region.spenclib import SPENC
+
+        w = libpysal.weights.lat2W(20, 20)
+        x = numpy.random.default_rng(0).normal(size=(400, 3))
+        model = SPENC(n_clusters=numpy.inf, gamma=0.5, random_state=RANDOM_STATE)
+        model.fit(x, w.sparse, floor=20)
+
+        assert len(numpy.unique(model.labels_)) > 2
+        assert numpy.bincount(model.labels_).min() > 20
+
+    def test_spenc_hierarchical_keeps_params(self):
+        from spopt.region.spenclib import SPENC
+
+        x = self.mexico[self.default_attrs_mexico].values
+        w = self.w_mexico.sparse
+        for n_clusters, assign_labels in [(4, "hierarchical"), (numpy.inf, "kmeans")]:
+            model = SPENC(
+                n_clusters=n_clusters,
+                gamma=1e-9,
+                assign_labels=assign_labels,
+                random_state=RANDOM_STATE,
+            )
+            params = model.get_params()
+            labels = model.fit(x, w, floor=3).labels_.copy()
+            assert model.get_params() == params
+            # a second fit finds the same labels
+            numpy.testing.assert_equal(model.fit(x, w, floor=3).labels_, labels)
+
+    def test_spenc_hierarchical_n_jobs(self):
+        from spopt.region.spenclib import SPENC
+
+        w = libpysal.weights.lat2W(20, 20)
+        x = numpy.random.default_rng(0).normal(size=(400, 3))
+        labels = []
+        for n_jobs in (1, 3):
+            model = SPENC(
+                n_clusters=numpy.inf,
+                gamma=0.5,
+                random_state=RANDOM_STATE,
+                n_jobs=n_jobs,
+            )
+            labels.append(model.fit(x, w.sparse, floor=20).labels_)
+
+        numpy.testing.assert_array_equal(*labels)
+
+    def test_spenc_kmeans_n_jobs(self, monkeypatch):
+        from spopt.region.spenclib import SPENC, abstracts
+
+        seen = []
+        threadpool_limits = abstracts.threadpool_limits
+
+        def spy(limits=None, **kwargs):
+            seen.append(limits)
+            return threadpool_limits(limits=limits, **kwargs)
+
+        monkeypatch.setattr(abstracts, "threadpool_limits", spy)
+        w = libpysal.weights.lat2W(10, 10).sparse
+        x = numpy.random.default_rng(0).normal(size=(100, 3))
+        for n_jobs in (None, -1, 2):
+            SPENC(
+                n_clusters=3,
+                assign_labels="kmeans",
+                random_state=RANDOM_STATE,
+                n_jobs=n_jobs,
+            ).fit(x, w)
+
+        assert SPENC().n_jobs is None
+        assert seen == [None, None, 2]
+
+    def test_spenc_cache(self):
+        from spopt.region.spenclib import SPENC
+        from spopt.region.spenclib.abstracts import _fingerprint
+
+        w = libpysal.weights.lat2W(20, 20).sparse
+        x = numpy.random.default_rng(0).normal(size=(400, 2))
+        cache = {}
+        SPENC(n_clusters=6, random_state=RANDOM_STATE).fit(x, w, cache=cache)
+        assert len(cache) == 1
+        (entry,) = cache.values()
+        assert entry["vectors"].shape == (400, 6)
+
+        # fewer clusters reuse the cached eigenpairs unchanged
+        cached = SPENC(n_clusters=4, random_state=RANDOM_STATE)
+        fresh = SPENC(n_clusters=4, random_state=RANDOM_STATE)
+        cached.fit(x, w, cache=cache)
+        fresh.fit(x, w)
+        assert len(cache) == 1
+        assert entry["vectors"].shape == (400, 6)
+        numpy.testing.assert_array_equal(cached.labels_, fresh.labels_)
+
+        # more clusters extend them
+        SPENC(n_clusters=8, random_state=RANDOM_STATE).fit(x, w, cache=cache)
+        (entry,) = cache.values()
+        assert entry["vectors"].shape == (400, 8)
+
+        assert _fingerprint(w) == _fingerprint(w.tocoo())
+        assert _fingerprint(w) != _fingerprint(w * 2)
+
+    def test_contiguous_labels(self):
+        from spopt.region.spenclib.utils import contiguous_labels
+
+        w = libpysal.weights.lat2W(4, 4).sparse
+        labels = numpy.array([0, 0, 1, 1, 0, 2, 1, 1, 2, 2, 0, 1, 2, 2, 2, 0])
+        observed = contiguous_labels(w, labels)
+        expected = numpy.array([0, 0, 1, 1, 0, 2, 1, 1, 2, 2, 1, 1, 2, 2, 2, 1])
+        numpy.testing.assert_array_equal(observed, expected)
+
+    @pytest.mark.parametrize("assign_labels", ["kmeans", "minibatch_kmeans"])
+    def test_spenc_kmeans_contiguous(self, assign_labels):
+        from scipy.sparse.csgraph import connected_components
+
+        from spopt.region.spenclib import SPENC
+
+        w = libpysal.weights.lat2W(20, 20).sparse
+        x = numpy.random.default_rng(0).normal(size=(400, 2))
+        labels = []
+        for _ in range(2):
+            model = SPENC(
+                n_clusters=6,
+                assign_labels=assign_labels,
+                random_state=RANDOM_STATE,
+                n_init=3,
+            )
+            labels.append(model.fit(x, w, contiguous=True).labels_)
+
+        numpy.testing.assert_array_equal(*labels)
+        assert len(numpy.unique(labels[0])) == 6
+        for label in numpy.unique(labels[0]):
+            members = labels[0] == label
+            n_pieces, _ = connected_components(w[members][:, members])
+            assert n_pieces == 1
+
+    def test_knn_affinity(self):
+        from sklearn.neighbors import kneighbors_graph
+
+        from spopt.region.spenclib import SPENC
+        from spopt.region.spenclib.utils import knn_affinity
+
+        w = libpysal.weights.lat2W(15, 15).sparse
+        x = numpy.random.default_rng(0).normal(size=(225, 3))
+        connectivity = kneighbors_graph(x, 12, include_self=True)
+        expected = w.multiply(0.5 * (connectivity + connectivity.T)).toarray()
+        observed = knn_affinity(w, x, n_neighbors=12, chunk_size=40)
+        numpy.testing.assert_array_equal(observed.toarray(), expected)
+
+        model = SPENC(n_clusters=3, affinity="nearest_neighbors", n_neighbors=12)
+        model.fit(x, w)
+        numpy.testing.assert_array_equal(model.affinity_matrix_.toarray(), expected)
+
+    def test_sweep_objective(self):
+        from spopt.region.spenclib import SPENC
+        from spopt.region.spenclib.abstracts import _sweep_objective
+
+        affinity = self.w_mexico.sparse.tocsr()
+        vector = numpy.random.default_rng(0).normal(size=32)
+        sorted_vector, surface = _sweep_objective(vector, affinity)
+
+        for m, cutpoint in enumerate(sorted_vector[:-1], start=1):
+            cut = vector <= cutpoint
+            assoc_a = affinity[cut].sum()
+            assoc_b = affinity[~cut].sum()
+            cut_ab = affinity[cut][:, ~cut].sum() * 2
+            expected = cut_ab / assoc_a + cut_ab / assoc_b
+            numpy.testing.assert_allclose(surface[m], expected)
+        assert numpy.isinf(surface[[0, -1]]).all()
+
+        model = SPENC()
+        grid_cut, grid_score = model._make_hierarchical_cut(
+            vector, affinity, 100, cut_method="gridsearch"
+        )
+        sweep_cut, sweep_score = model._make_hierarchical_cut(
+            vector, affinity, 100, cut_method="sweep"
+        )
+        assert sweep_score == surface.min() <= grid_score
+        assert sweep_cut.sum() == numpy.argmin(surface)
+
+    def test_spenc_eigen_solvers(self):
+        from sklearn.metrics import adjusted_rand_score
+
+        from spopt.region.spenclib import SPENC
+
+        w = libpysal.weights.lat2W(30, 30)
+        x = numpy.random.default_rng(0).normal(size=(900, 3))
+        kws = {"gamma": 0.5, "random_state": RANDOM_STATE, "n_clusters": 8}
+        known = SPENC(assign_labels="hierarchical", **kws).fit(x, w.sparse).labels_
+
+        for eigen_solver in ("arpack", "lobpcg"):
+            model = SPENC(
+                assign_labels="hierarchical", eigen_solver=eigen_solver, **kws
+            )
+            model.fit(x, w.sparse, warm_start=True)
+            assert adjusted_rand_score(known, model.labels_) == 1
+
+        known = SPENC(**kws).fit(x, w.sparse).labels_
+        model = SPENC(eigen_solver="lobpcg", **kws).fit(x, w.sparse)
+        assert adjusted_rand_score(known, model.labels_) == 1
+
+    def test_spenc_amg_requires_pyamg(self):
+        import importlib.util
+
+        from spopt.region.spenclib import SPENC
+
+        if importlib.util.find_spec("pyamg") is not None:
+            pytest.skip("pyamg is installed")
+        w = libpysal.weights.lat2W(10, 10)
+        x = numpy.random.default_rng(0).normal(size=(100, 2))
+        with pytest.raises(ValueError, match="pyamg is not available"):
+            SPENC(n_clusters=3, eigen_solver="amg").fit(x, w.sparse)
+
+    def test_spenc_sample_batch(self):
+        from spopt.region.spenclib import SPENC
+
+        w = libpysal.weights.lat2W(10, 10)
+        model = SPENC(n_clusters=4)
+        serial = model.sample_batch(w.sparse, n_samples=6, seed=RANDOM_STATE)
+        out = numpy.zeros((6, 100), dtype=numpy.int32)
+        serial_out = model.sample_batch(
+            w.sparse, n_samples=6, seed=RANDOM_STATE, out=out
+        )
+        assert serial_out is out
+        numpy.testing.assert_equal(serial, out)
+        out[:] = 0
+        # more chunks than the two in flight per process
+        parallel = model.sample_batch(
+            w.sparse, n_samples=6, seed=RANDOM_STATE, n_jobs=2, out=out, chunk_size=1
+        )
+
+        assert parallel is out
+        assert serial.dtype == numpy.int32
+        numpy.testing.assert_equal(serial, parallel)
+        assert all(len(numpy.unique(labels)) == 4 for labels in serial)
+        assert len({tuple(labels) for labels in serial}) > 1
+
+        with pytest.raises(ValueError, match="out has shape"):
+            model.sample_batch(w.sparse, n_samples=2, out=out)
+
+    def test_boundary_fraction(self):
+        from spopt.region.spenclib import SPENC
+        from spopt.region.spenclib.scores import boundary_fraction
+
+        w = libpysal.weights.lat2W(3, 3).sparse
+        labels = numpy.array([[0, 0, 1, 0, 0, 1, 2, 2, 2], [0] * 9])
+        # every unit except the corner 0 touches another region
+        assert boundary_fraction(w, labels[0]) == 8 / 9
+        assert boundary_fraction(w, labels[1]) == 0
+        numpy.testing.assert_equal(boundary_fraction(w, labels), [8 / 9, 0])
+
+        x = numpy.arange(18.0).reshape(9, 2) ** 2
+        labels[1] = [0, 0, 0, 1, 1, 1, 1, 1, 1]
+        model = SPENC()
+        scores = model.score(x, w, labels=labels)
+        assert scores.shape == (2,)
+        assert scores[0] == model.score(x, w, labels=labels[0])
+        # a stack of one labeling is still a stack
+        numpy.testing.assert_equal(model.score(x, w, labels=labels[:1]), scores[:1])
@@ -1,7 +1,9 @@
 import geopandas
 import libpysal
 import numpy
+import pytest
 from packaging.version import Version
+from sklearn.cluster import AgglomerativeClustering, ward_tree
 
 from spopt.region import WardSpatial
 
@@ -31,3 +33,66 @@ class TestWard:
         model.solve()
 
         numpy.testing.assert_equal(model.labels_, self.known_labels)
+
+    def test_ward_cache_tree(self):
+        model = WardSpatial(
+            gdf=self.mexico, w=self.w, attrs_name=self.attrs_name, cache_tree=True
+        )
+        model.solve()
+        numpy.testing.assert_equal(model.labels_, self.known_labels)
+
+        x = self.mexico[self.attrs_name].values
+        for n_clusters in [1, 2, 8, 32]:
+            known = AgglomerativeClustering(
+                n_clusters=n_clusters, connectivity=self.w.sparse, linkage="ward"
+            ).fit(x)
+            numpy.testing.assert_equal(model.cut(n_clusters), known.labels_)
+        threshold = numpy.median(model.distances_)
+        known = AgglomerativeClustering(
+            n_clusters=None,
+            distance_threshold=threshold,
+            connectivity=self.w.sparse,
+            linkage="ward",
+        ).fit(x)
+        observed = model.cut(distance_threshold=threshold)
+        numpy.testing.assert_equal(observed, known.labels_)
+
+        with pytest.raises(ValueError, match="Exactly one of n_clusters"):
+            model.cut()
+        with pytest.raises(ValueError, match="Cannot extract more clusters"):
+            model.cut(33)
+
+    def test_ward_low_memory(self):
+        model = WardSpatial(
+            gdf=self.mexico, w=self.w, attrs_name=self.attrs_name, low_memory=True
+        )
+        model.solve()
+        numpy.testing.assert_equal(model.labels_, self.known_labels)
+
+        x = self.mexico[self.attrs_name].values
+        children, _, _, _, distances = ward_tree(
+            x, connectivity=self.w.sparse, return_distance=True
+        )
+        numpy.testing.assert_equal(model.children_, children)
+        numpy.testing.assert_allclose(model.distances_, distances, rtol=1e-5)
+
+    @pytest.mark.filterwarnings("ignore:The weights matrix is not fully")
+    @pytest.mark.filterwarnings("ignore:the number of connected components")
+    def test_ward_low_memory_disconnected(self):
+        # two lattices and two islands
+        w = libpysal.weights.lat2W(6, 6)
+        neighbors = {
+            area: [alter for alter in alters if (area % 6 < 3) == (alter % 6 < 3)]
+            for area, alters in w.neighbors.items()
+        }
+        w = libpysal.weights.W({**neighbors, 36: [], 37: []})
+        x = numpy.random.default_rng(RANDOM_STATE).normal(size=(38, 2))
+        gdf = geopandas.GeoDataFrame({"a": x[:, 0], "b": x[:, 1]})
+        model = WardSpatial(gdf, w, ["a", "b"], low_memory=True)
+        with pytest.warns(UserWarning, match="number of connected components"):
+            model.cut(2)
+        assert len(model.children_) == 37
+        for n_clusters in (2, 3, 4, 8):
+            default = WardSpatial(gdf, w, ["a", "b"], n_clusters=n_clusters)
+            default.solve()
+            numpy.testing.assert_equal(model.cut(n_clusters), default.labels_)